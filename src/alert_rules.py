@@ -0,0 +1,164 @@
+import json
+import math
+import time
+import operator
+from typing import Dict, List, NamedTuple, Optional, Tuple
+
+DEFAULT_RADIATION_CPM = 125  # Used by rules that don't set radiation_cpm_above
+BUCKET_DEGREES = 10  # Grid cell size for matching events to regional rules
+ROWS = 180 // BUCKET_DEGREES
+COLUMNS = 360 // BUCKET_DEGREES
+
+# Config key -> (column, comparison); each present key becomes one batch filter
+CONDITIONS = {
+    "min_magnitude": ("mag", operator.ge),
+    "max_magnitude": ("mag", operator.le),
+    "min_depth_km": ("depth", operator.ge),
+    "max_depth_km": ("depth", operator.le),
+    "max_age_minutes": ("age_minutes", operator.le),
+}
+RULE_KEYS = set(CONDITIONS) | {"name", "region", "radiation_cpm_above"}
+
+class AlertRule(NamedTuple):
+    """One screening rule; every condition that is set must hold"""
+    name: str
+    checks: Tuple[Tuple[str, object, float], ...]  # (column, comparison, threshold)
+    region: Optional[Tuple[float, float, float, float]]  # min_lat, max_lat, min_lon, max_lon
+    radiation_cpm_above: float
+
+class EventBatch(NamedTuple):
+    """Column-wise view of a list of USGS GeoJSON features (NaN for missing values)"""
+    mag: List[float]
+    depth: List[float]
+    lat: List[float]
+    lon: List[float]
+    age_minutes: List[float]
+
+def _number(value):
+    return float(value) if isinstance(value, (int, float)) else math.nan
+
+def to_batch(events, now=None) -> EventBatch:
+    now_ms = (now if now is not None else time.time()) * 1000
+    mag, depth, lat, lon, age = [], [], [], [], []
+    for event in events:
+        coords = event["geometry"]["coordinates"]
+        props = event["properties"]
+        mag.append(_number(props.get("mag")))
+        depth.append(_number(coords[2]) if len(coords) > 2 else math.nan)
+        lat.append(_number(coords[1]))
+        lon.append(_number(coords[0]))
+        event_time = props.get("time")
+        age.append((now_ms - event_time) / 60000 if isinstance(event_time, (int, float)) else math.nan)
+    return EventBatch(mag, depth, lat, lon, age)
+
+def _cell(lat, lon):
+    # Clamped so the poles and lon 180 land in the last row/column
+    row = min(max(int((lat + 90) // BUCKET_DEGREES), 0), ROWS - 1)
+    column = min(max(int((lon + 180) // BUCKET_DEGREES), 0), COLUMNS - 1)
+    return row, column
+
+def _region_cells(region):
+    min_lat, max_lat, min_lon, max_lon = region
+    (first_row, first), (last_row, last) = _cell(min_lat, min_lon), _cell(max_lat, max_lon)
+    if min_lon <= max_lon:
+        columns = range(first, last + 1)
+    else:
+        # min_lon > max_lon wraps across the antimeridian
+        columns = list(range(first, COLUMNS)) + list(range(0, last + 1))
+    return [(row, column) for row in range(first_row, last_row + 1) for column in columns]
+
+def _in_region(region, lat, lon):
+    min_lat, max_lat, min_lon, max_lon = region
+    if not min_lat <= lat <= max_lat:
+        return False
+    if min_lon <= max_lon:
+        return min_lon <= lon <= max_lon
+    return lon >= min_lon or lon <= max_lon
+
+def parse_rule(config: dict) -> AlertRule:
+    unknown = set(config) - RULE_KEYS
+    if unknown:
+        raise Exception(f"alert rule {config.get('name', '?')!r}: unknown key(s) {', '.join(sorted(unknown))}")
+    if "name" not in config:
+        raise Exception(f"alert rule without a name: {config}")
+    checks = tuple(
+        (column, compare, float(config[key]))
+        for key, (column, compare) in CONDITIONS.items()
+        if config.get(key) is not None
+    )
+    region = config.get("region")
+    if region is not None:
+        try:
+            region = (float(region["min_lat"]), float(region["max_lat"]), float(region["min_lon"]), float(region["max_lon"]))
+        except (KeyError, TypeError, ValueError):
+            raise Exception(f"alert rule {config['name']!r}: region needs numeric min_lat, max_lat, min_lon and max_lon")
+    radiation = config.get("radiation_cpm_above")
+    return AlertRule(config["name"], checks, region, float(DEFAULT_RADIATION_CPM if radiation is None else radiation))
+
+class RuleSet:
+    """Alert rules compiled once into per-cell rule lists and column filters.
+
+    screen() buckets a whole batch of events by grid cell in one pass, then
+    runs each rule that covers a cell as a chain of list filters over just
+    that cell's events. Adding regional rules only costs time for events in
+    their region; global rules (no region) run once over the whole batch.
+    """
+
+    def __init__(self, rules: List[AlertRule]):
+        self.rules = list(rules)
+        self.global_rules = [rule for rule in self.rules if rule.region is None]
+        self.cell_rules: Dict[Tuple[int, int], List[AlertRule]] = {}
+        for rule in self.rules:
+            if rule.region is not None:
+                for cell in _region_cells(rule.region):
+                    self.cell_rules.setdefault(cell, []).append(rule)
+
+    def __len__(self):
+        return len(self.rules)
+
+    def screen(self, events, now=None) -> Dict[int, List[AlertRule]]:
+        """Return {event index: [matching rules]} for the events that match at least one rule"""
+        batch = to_batch(events, now)
+        columns = batch._asdict()
+        cells: Dict[Tuple[int, int], List[int]] = {}
+        for i, (lat, lon) in enumerate(zip(batch.lat, batch.lon)):
+            if lat == lat and lon == lon:  # Skip NaN coordinates
+                cells.setdefault(_cell(lat, lon), []).append(i)
+
+        matches: Dict[int, List[AlertRule]] = {}
+        everything = [i for indices in cells.values() for i in indices]
+        work = [(rule, everything) for rule in self.global_rules]
+        work += [(rule, indices) for cell, indices in cells.items() for rule in self.cell_rules.get(cell, ())]
+        for rule, selected in work:
+            if rule.region is not None:
+                lat, lon = batch.lat, batch.lon
+                selected = [i for i in selected if _in_region(rule.region, lat[i], lon[i])]
+            for column, compare, threshold in rule.checks:
+                if not selected:
+                    break
+                values = columns[column]
+                selected = [i for i in selected if compare(values[i], threshold)]
+            for i in selected:
+                matches.setdefault(i, []).append(rule)
+        return dict(sorted(matches.items()))
+
+    def describe(self):
+        """One line per rule for the debug log"""
+        lines = []
+        for rule in self.rules:
+            parts = [f"{column} {'>=' if compare is operator.ge else '<='} {threshold:g}"
+                     for column, compare, threshold in rule.checks]
+            if rule.region:
+                parts.append("region lat {:g}..{:g} lon {:g}..{:g}".format(*rule.region))
+            parts.append(f"radiation > {rule.radiation_cpm_above:g} CPM")
+            lines.append(f"{rule.name}: {', '.join(parts)}")
+        return lines
+
+def load_rules(path) -> RuleSet:
+    """Read {"rules": [...]} from a JSON file and compile it"""
+    with open(path) as f:
+        config = json.load(f)
+    rules = config.get("rules") if isinstance(config, dict) else None
+    if not rules:
+        raise Exception(f"{path}: expected a non-empty \"rules\" list")
+    return RuleSet([parse_rule(rule) for rule in rules])
@@ -0,0 +1,202 @@
+import os
+import argparse
+import random
+import base64
+from datetime import datetime, timezone
+from typing import NamedTuple, Tuple
+from image_generator import DEFAULT_SETTING, DEFAULT_STYLE, generate_images
+from bsky_media import upload_images
+from http_pool import get_session
+from bsky_auth import login
+import metrics
+import profiling
+from image_queue import ImageQueue
+import io
+import threading
+
+IMAGES_PER_POST = 1  # Up to 4; images are uploaded concurrently
+PREFILL_BATCH = 4  # Images requested per generation call when filling the queue
+
+class AnimalBot(NamedTuple):
+    """Everything that differs between the kitten and puppy accounts"""
+    name: str  # Used for the queue, archive file names and commit messages
+    subject: str
+    theme: str
+    activity: str
+    handle_env: str
+    password_env: str
+    alt_text: str
+    post_texts: Tuple[str, ...]  # One is picked at random per post
+    fact_system_prompt: str
+    fact_user_prompt: str
+    style: str = DEFAULT_STYLE
+    setting: str = DEFAULT_SETTING
+
+def bsky_login_session(pds_url: str, handle: str, password: str):
+    # Cached per account, so a shared runner logs each account in once
+    return login(pds_url, handle, password)
+
+def create_bsky_post(session, pds_url, post_content, embed=None):
+    now = datetime.now(timezone.utc).isoformat().replace("+00:00", "Z")
+    post = {
+        "$type": "app.bsky.feed.post",
+        "text": post_content,
+        "createdAt": now,
+    }
+    if embed:
+        post["embed"] = embed
+
+    resp = get_session().post(
+        pds_url + "/xrpc/com.atproto.repo.createRecord",
+        headers={"Authorization": "Bearer " + session["accessJwt"]},
+        json={
+            "repo": session["did"],
+            "collection": "app.bsky.feed.post",
+            "record": post,
+        },
+    )
+    resp.raise_for_status()
+    return resp.json()
+
+def generate_fact(bot: AnimalBot):
+    from openai import OpenAI  # Deferred: the SDK takes most of a second to import and facts are disabled
+    client = OpenAI(api_key=os.getenv("OPENAI_API_KEY"))
+    response = client.chat.completions.create(
+        model="gpt-4o",
+        messages=[
+            {"role": "system", "content": bot.fact_system_prompt},
+            {"role": "user", "content": bot.fact_user_prompt}
+        ]
+    )
+
+    # Directly access the 'content' attribute of the message
+    fact = response.choices[0].message.content
+    return fact
+
+def decode_image(image_b64):
+    # Decode straight into Pillow; nothing touches the disk
+    from PIL import Image  # Deferred: only the generation path decodes images
+    return Image.open(io.BytesIO(base64.b64decode(image_b64)))
+
+def compress_image(img, max_size=1000000, img_format="JPEG"):
+    # Probe once, then binary-search quality (resizing once if needed).
+    # The result holds a memoryview over the encoder's buffer, not a copy.
+    from image_encoder import encode_image
+    return encode_image(img, max_size=max_size, img_format=img_format)
+
+def generate_compressed_images(bot: AnimalBot, count=1):
+    # One batched generation request, then compress each image in memory
+    results = []
+    with metrics.timer(stage="image_generation", bot=bot.name):
+        generated = generate_images(bot.subject, bot.theme, n=count, style=bot.style,
+                                    setting=bot.setting, activity=bot.activity)
+    metrics.counter("images_generated", len(generated), bot=bot.name)
+    for image_b64 in generated:
+        # Compress the image to ensure it's under 1MB
+        with metrics.timer(stage="compression", bot=bot.name), decode_image(image_b64) as img:
+            results.append(compress_image(img))
+    return results
+
+def prepare_images(bot: AnimalBot, count=IMAGES_PER_POST, queue=None):
+    # Take pre-generated images from the queue first and only generate what is missing.
+    # Returns the encoded buffers, their alt texts and the claimed queue entries,
+    # which the caller commits after posting or releases on failure.
+    buffers, alt_texts, claimed = [], [], []
+    while len(buffers) < count:
+        queued = queue.pop() if queue is not None else None
+        if queued is None:
+            break
+        claimed.append(queued)
+        buffers.append(queued.data)
+        alt_texts.append(queued.alt_text)
+        metrics.counter("images_from_queue", bot=bot.name)
+    if len(buffers) < count:
+        try:
+            results = generate_compressed_images(bot, count - len(buffers))
+        except BaseException:
+            for queued in claimed:
+                queued.release()
+            raise
+        for result in results:
+            buffers.append(result.data)
+            alt_texts.append(bot.alt_text)
+    return buffers, alt_texts, claimed
+
+def prefill_queue(bot: AnimalBot, queue, depth, batch_size=PREFILL_BATCH):
+    added = queue.fill(lambda count: generate_compressed_images(bot, count), bot.alt_text, depth, batch_size)
+    print(f"Added {added} image(s) to the {bot.name} queue, {len(queue)} ready")
+
+def start_refill(bot: AnimalBot, queue, depth):
+    # Top the queue back up without holding up the post
+    refiller = threading.Thread(target=prefill_queue, args=(bot, queue, depth))
+    refiller.start()
+    return refiller
+
+def archive_images(bot: AnimalBot, buffers, alt_texts):
+    # Commit straight from memory to the content-addressed archive on the generated branch
+    from image_archive import ImageArchive  # Pulls in Pillow and git; imported on the archive thread, after the post is made
+    timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+    archive = ImageArchive()
+    for img_bytes, alt_text in zip(buffers, alt_texts):
+        archive.add(img_bytes, bot.name, alt_text)
+    count = len(buffers)
+    with metrics.timer(stage="git_archive", bot=bot.name):
+        archive.commit(f"Add {count} generated {bot.name} image{'s' if count > 1 else ''} {timestamp}")
+
+def start_archive(bot: AnimalBot, buffers, alt_texts):
+    # Archive in the background so git never holds up the queue refill
+    archiver = threading.Thread(target=archive_images, args=(bot, buffers, alt_texts))
+    archiver.start()
+    return archiver
+
+def main(bot: AnimalBot, refill=0):
+    pds_url = "https://bsky.social"
+    handle = os.getenv(bot.handle_env)
+    password = os.getenv(bot.password_env)
+
+    # Log in to Bluesky
+    with metrics.timer(stage="login", bot=bot.name):
+        session = bsky_login_session(pds_url, handle, password)
+    queue = ImageQueue(bot.name)
+
+    # Randomly pick one of the captions. Fun facts (generate_fact) are disabled
+    # for now as they kept repeating, so every post is a picture.
+    post_content = random.choice(bot.post_texts)
+    buffers, alt_texts, claimed = prepare_images(bot, queue=queue)
+    refiller = None
+    try:
+        embed = upload_images(pds_url, session["accessJwt"], buffers, alt_texts)
+
+        # Generation for the next run overlaps with this post; the claimed images are already ours
+        refiller = start_refill(bot, queue, refill) if refill else None
+
+        # Create a post on Bluesky
+        with metrics.timer(stage="post", bot=bot.name):
+            create_bsky_post(session, pds_url, post_content, embed)
+    except BaseException:
+        # Nothing was posted: put the queued images back for the next run
+        for queued in claimed:
+            queued.release()
+        raise
+    for queued in claimed:
+        queued.commit()
+    metrics.counter("posts", bot=bot.name)
+    # Only posted images are archived; the push overlaps with the refill
+    archiver = start_archive(bot, buffers, alt_texts)
+    archiver.join()
+    if refiller:
+        refiller.join()
+
+def run_cli(bot: AnimalBot):
+    parser = argparse.ArgumentParser(description=f"Post a generated {bot.name} image to Bluesky.")
+    parser.add_argument("--prefill", type=int, metavar="N", help="Fill the pre-generated image queue up to N images and exit", default=None)
+    parser.add_argument("--refill", type=int, metavar="N", help="After posting, top the queue back up to N images", default=0)
+    parser.add_argument("--metrics-dir", help="Write per-run metrics (JSON and Prometheus text) to this directory", default=None)
+    parser.add_argument("--profile", nargs="?", const=profiling.PROFILE_DIR, metavar="DIR", help="Profile the run (cProfile, tracemalloc, collapsed stacks) and write reports to DIR (default: profile)", default=None)
+    args = parser.parse_args()
+    metrics.configure(bot.name, args.metrics_dir)
+
+    if args.prefill is not None:
+        profiling.run(bot.name, args.profile, prefill_queue, bot, ImageQueue(bot.name), args.prefill)
+    else:
+        profiling.run(bot.name, args.profile, main, bot, refill=args.refill)
@@ -0,0 +1,87 @@
+import argparse
+import io
+import random
+import time
+from PIL import Image, ImageDraw, ImageFilter
+from image_encoder import MAX_BLOB_SIZE, encode_image
+
+def legacy_encode(img, max_size=MAX_BLOB_SIZE):
+    """The previous compress_image loop, kept here as the benchmark baseline"""
+    if img.mode in ('RGBA', 'P'):
+        img = img.convert('RGB')
+    buffer = io.BytesIO()
+    quality = 85
+    width, height = img.size
+    encodes = 0
+    while True:
+        buffer.seek(0)
+        buffer.truncate()
+        img.save(buffer, format='JPEG', quality=quality)
+        encodes += 1
+        size = buffer.tell()
+        if size <= max_size or quality <= 10:
+            break
+        quality -= 5
+        if quality <= 50:
+            width = int(width * 0.9)
+            height = int(height * 0.9)
+            img = img.resize((width, height), Image.Resampling.LANCZOS)
+    return buffer.getvalue(), encodes
+
+# Large enough that none fits MAX_BLOB_SIZE on the first probe; the 2048px one also needs a resize
+SYNTHETIC_SIZES = (1536, 1536, 1536, 2048)
+
+def synthetic_image(seed, size=None):
+    """Build a busy test image (shapes over noise), cycling through SYNTHETIC_SIZES unless size is given"""
+    size = size or SYNTHETIC_SIZES[seed % len(SYNTHETIC_SIZES)]
+    rng = random.Random(seed)
+    noise = rng.randbytes(size * size * 3)
+    img = Image.frombytes("RGB", (size, size), noise)
+    draw = ImageDraw.Draw(img)
+    for _ in range(10 + 10 * (seed % 4)):
+        x0, y0 = rng.randrange(size), rng.randrange(size)
+        x1, y1 = x0 + rng.randrange(20, 200), y0 + rng.randrange(20, 200)
+        color = (rng.randrange(256), rng.randrange(256), rng.randrange(256))
+        draw.ellipse((x0, y0, x1, y1), fill=color)
+    return img.filter(ImageFilter.GaussianBlur(0.4 * (seed % 3)))
+
+def run(name, images, encoder):
+    start = time.perf_counter()
+    total_encodes = 0
+    total_bytes = 0
+    for img in images:
+        data, encodes = encoder(img)
+        total_encodes += encodes
+        total_bytes += len(data)
+    elapsed = time.perf_counter() - start
+    count = len(images)
+    print(f"{name:<8} images={count} encodes/image={total_encodes / count:.2f} "
+          f"wall={elapsed:.2f}s ({elapsed / count * 1000:.0f} ms/image) avg_size={total_bytes // count} bytes")
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark image encoding against the uploadBlob size limit.")
+    parser.add_argument("images", nargs="*", help="Image files to encode (synthetic images are used if omitted)")
+    parser.add_argument("--count", type=int, default=5, help="Number of synthetic images to generate")
+    parser.add_argument("--max-size", type=int, default=MAX_BLOB_SIZE, help="Target size in bytes")
+    args = parser.parse_args()
+
+    if args.images:
+        images = []
+        for path in args.images:
+            with Image.open(path) as img:
+                images.append(img.copy())
+    else:
+        images = [synthetic_image(seed) for seed in range(args.count)]
+
+    def encode_with(img_format):
+        def encoder(img):
+            result = encode_image(img, max_size=args.max_size, img_format=img_format)
+            return result.data, result.encodes
+        return encoder
+
+    run("legacy", images, lambda img: legacy_encode(img, args.max_size))
+    run("jpeg", images, encode_with("JPEG"))
+    run("webp", images, encode_with("WEBP"))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,78 @@
+import os
+import re
+import sys
+import argparse
+import statistics
+import subprocess
+
+# Entry points a cron run imports before doing any work
+MODULES = ("onlykittens_bot", "onlypuppies_bot", "top4news_bot", "check_nuclear_events", "run_bots")
+# Heavy dependencies that must only be imported on first use
+DEFERRED = ("openai", "PIL")
+# Every bot needs requests; startup is measured against it so the check holds on any machine
+BASELINE_MODULE = "requests"
+MAX_RATIO = 2.0  # Fail if a bot takes longer to import than this multiple of the baseline
+
+SRC_DIR = os.path.dirname(os.path.abspath(__file__))
+IMPORTTIME_LINE = re.compile(r"import time:\s+(\d+) \|\s+(\d+) \|( *)(\S+)")
+
+def import_profile(module):
+    """Import module in a fresh interpreter; return (cumulative microseconds, {package: cumulative})"""
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        cwd=SRC_DIR, capture_output=True, text=True,
+    )
+    if result.returncode != 0:
+        raise Exception(f"importing {module} failed:\n{result.stderr[-2000:]}")
+    total = None
+    packages = {}
+    for line in result.stderr.splitlines():
+        match = IMPORTTIME_LINE.match(line)
+        if not match:
+            continue
+        cumulative, name = int(match.group(2)), match.group(4)
+        top = name.split(".")[0]
+        packages[top] = max(packages.get(top, 0), cumulative)
+        if name == module and len(match.group(3)) == 1:  # Top level, not a nested import of the same name
+            total = cumulative
+    return total, packages
+
+def measure(module, repeat):
+    """Median cumulative import time in ms over repeat runs, plus the packages from the last run"""
+    times = []
+    packages = {}
+    for _ in range(repeat):
+        total, packages = import_profile(module)
+        times.append(total / 1000)
+    return statistics.median(times), packages
+
+def main():
+    parser = argparse.ArgumentParser(description="Measure bot startup with python -X importtime and fail on regressions.")
+    parser.add_argument("modules", nargs="*", help=f"Modules to check (default: {', '.join(MODULES)})")
+    parser.add_argument("--repeat", type=int, default=5, help="Fresh interpreters per module; the median is reported")
+    parser.add_argument("--max-ratio", type=float, default=MAX_RATIO,
+                        help=f"Allowed import time as a multiple of 'import {BASELINE_MODULE}'")
+    args = parser.parse_args()
+
+    local = {name[:-3] for name in os.listdir(SRC_DIR) if name.endswith(".py")}
+    baseline, _ = measure(BASELINE_MODULE, args.repeat)
+    print(f"{BASELINE_MODULE:<22} {baseline:8.1f} ms  (baseline)")
+    failures = []
+    for module in args.modules or MODULES:
+        elapsed, packages = measure(module, args.repeat)
+        heaviest = sorted((item for item in packages.items() if item[0] not in local), key=lambda item: -item[1])
+        heaviest = ", ".join(f"{name} {us / 1000:.0f}ms" for name, us in heaviest[:3])
+        ratio = elapsed / baseline
+        print(f"{module:<22} {elapsed:8.1f} ms  x{ratio:.2f}  heaviest: {heaviest}")
+        loaded = [name for name in DEFERRED if name in packages]
+        if loaded:
+            failures.append(f"{module} imports {', '.join(loaded)} at startup")
+        if ratio > args.max_ratio:
+            failures.append(f"{module} takes {elapsed:.0f} ms to import, over {args.max_ratio}x '{BASELINE_MODULE}' ({baseline:.0f} ms)")
+
+    for failure in failures:
+        print(f"FAIL: {failure}")
+    return 1 if failures else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,90 @@
+import os
+import json
+import time
+import base64
+import threading
+from http_pool import get_session
+
+SESSION_CACHE_ENV = "BSKY_SESSION_CACHE"  # Optional file to persist sessions between runs
+EXPIRY_MARGIN = 60  # Seconds; refresh a token this long before it actually expires
+
+_sessions = {}
+_sessions_lock = threading.Lock()  # Guards _sessions, _account_locks and the cache file
+_account_locks = {}  # One lock per account, held across its network calls
+
+def _account_lock(key):
+    with _sessions_lock:
+        return _account_locks.setdefault(key, threading.Lock())
+
+def _jwt_expiry(token) -> float:
+    """Read the exp claim of a JWT without verifying it (we only need to know when to refresh)"""
+    try:
+        payload = token.split(".")[1]
+        payload += "=" * (-len(payload) % 4)
+        return float(json.loads(base64.urlsafe_b64decode(payload))["exp"])
+    except (IndexError, KeyError, ValueError):
+        return 0.0
+
+def _load_cache(path):
+    try:
+        with open(path) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+def _save_cache(path):
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    tmp = path + ".tmp"
+    # Tokens are credentials: keep the file private to this user
+    with open(os.open(tmp, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600), "w") as f:
+        json.dump(_sessions, f)
+    os.replace(tmp, path)
+
+def _create(pds_url, handle, password):
+    # https://docs.bsky.app/docs/get-started#create-a-session
+    resp = get_session().post(
+        pds_url + "/xrpc/com.atproto.server.createSession",
+        json={"identifier": handle, "password": password},
+    )
+    resp.raise_for_status()
+    return resp.json()
+
+def _refresh(pds_url, session):
+    resp = get_session().post(
+        pds_url + "/xrpc/com.atproto.server.refreshSession",
+        headers={"Authorization": "Bearer " + session["refreshJwt"]},
+    )
+    if resp.status_code != 200:
+        return None
+    return resp.json()
+
+def login(pds_url: str, handle: str, password: str):
+    """Return a Bluesky session for handle, reusing a cached one while it is valid.
+
+    Sessions are kept per account for the life of the process, so several bots
+    (or several posts) sharing an account log in once. If BSKY_SESSION_CACHE is
+    set, sessions are also persisted there and refreshed with refreshJwt
+    instead of calling createSession again.
+    """
+    key = f"{pds_url}|{handle}"
+    cache_path = os.getenv(SESSION_CACHE_ENV)
+    with _account_lock(key):
+        with _sessions_lock:
+            if cache_path and not _sessions:
+                _sessions.update(_load_cache(cache_path))
+            session = _sessions.get(key)
+        now = time.time()
+        if session and _jwt_expiry(session.get("accessJwt", "")) - EXPIRY_MARGIN > now:
+            return session
+        # Only this account waits on the network; other accounts can log in meanwhile
+        if session and _jwt_expiry(session.get("refreshJwt", "")) - EXPIRY_MARGIN > now:
+            session = _refresh(pds_url, session)
+        else:
+            session = None
+        if session is None:
+            session = _create(pds_url, handle, password)
+        with _sessions_lock:
+            _sessions[key] = session
+            if cache_path:
+                _save_cache(cache_path)
+        return session
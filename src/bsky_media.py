@@ -0,0 +1,86 @@
+import os
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Union
+from http_pool import get_session
+import metrics
+
+MAX_BLOB_SIZE = 1000000  # Bluesky uploadBlob limit for images (bytes)
+MAX_IMAGES = 4  # app.bsky.embed.images allows at most four images per post
+
+def sniff_mimetype(header: bytes) -> str:
+    """Detect the image type from its leading bytes instead of trusting a file suffix"""
+    header = bytes(header[:16])
+    if header.startswith(b"\xff\xd8\xff"):
+        return "image/jpeg"
+    if header.startswith(b"\x89PNG\r\n\x1a\n"):
+        return "image/png"
+    if header[:4] == b"RIFF" and header[8:12] == b"WEBP":
+        return "image/webp"
+    if header[:6] in (b"GIF87a", b"GIF89a"):
+        return "image/gif"
+    if header[4:12] in (b"ftypavif", b"ftypavis"):
+        return "image/avif"
+    return "application/octet-stream"
+
+def _check_size(size):
+    if size > MAX_BLOB_SIZE:
+        raise Exception(
+            f"image file size too large. {MAX_BLOB_SIZE} bytes maximum, got: {size}"
+        )
+
+def upload_blob(pds_url, access_token, source, http=None) -> dict:
+    """Upload one image from a file path or a bytes-like buffer.
+
+    Files are streamed from disk and buffers are sent as a memoryview, so the
+    body is never duplicated in memory.
+    """
+    http = http or get_session()
+    with metrics.timer(stage="blob_upload"):
+        resp, size = _post_blob(http, pds_url, access_token, source)
+    resp.raise_for_status()
+    metrics.counter("upload_bytes", size)
+    return resp.json()["blob"]
+
+def _post_blob(http, pds_url, access_token, source):
+    if isinstance(source, (str, os.PathLike)):
+        with open(source, "rb") as f:
+            size = os.fstat(f.fileno()).st_size
+            mimetype = sniff_mimetype(f.read(16))
+            f.seek(0)
+            _check_size(size)
+            return http.post(
+                pds_url + "/xrpc/com.atproto.repo.uploadBlob",
+                headers={"Content-Type": mimetype, "Authorization": "Bearer " + access_token},
+                data=f,
+            ), size
+    body = memoryview(source)
+    _check_size(body.nbytes)
+    return http.post(
+        pds_url + "/xrpc/com.atproto.repo.uploadBlob",
+        headers={"Content-Type": sniff_mimetype(body[:16]), "Authorization": "Bearer " + access_token},
+        data=body,
+    ), body.nbytes
+
+def upload_images(pds_url: str, access_token: str, sources: List[Union[str, bytes, memoryview]],
+                  alt_text: Union[str, List[str]], http=None) -> dict:
+    """Upload up to four images concurrently and return the post embed.
+
+    alt_text may be a single string for every image or one string per image.
+    """
+    if not sources:
+        raise Exception("at least one image is required")
+    if len(sources) > MAX_IMAGES:
+        raise Exception(f"too many images. {MAX_IMAGES} maximum, got: {len(sources)}")
+    if isinstance(alt_text, str) or alt_text is None:
+        alt_texts = [alt_text or ""] * len(sources)
+    else:
+        alt_texts = list(alt_text)
+
+    http = http or get_session()
+    with ThreadPoolExecutor(max_workers=len(sources)) as pool:
+        blobs = list(pool.map(lambda src: upload_blob(pds_url, access_token, src, http), sources))
+
+    return {
+        "$type": "app.bsky.embed.images",
+        "images": [{"alt": alt, "image": blob} for alt, blob in zip(alt_texts, blobs)],
+    }
@@ -0,0 +1,211 @@
+import io
+import os
+import html
+import argparse
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from PIL import Image, features
+from git_archive import GitArchiver
+from image_archive import MANIFEST_PATH, load_manifest, parse_manifest
+
+GALLERY_DIR = os.path.join("docs", "gallery")
+THUMB_WIDTHS = (160, 320, 640)
+THUMB_QUALITY = 72
+PAGE_SIZE = 48
+RAW_BASE_URL = "https://raw.githubusercontent.com/appatalks/closetemail.com/generated/"
+
+def thumb_formats():
+    # AVIF needs a Pillow built with libavif; WebP is always produced
+    return ("avif", "webp") if features.check("avif") else ("webp",)
+
+def thumb_name(sha256, width, ext):
+    return f"{sha256[:16]}-{width}.{ext}"
+
+def missing_thumbs(thumbs_dir, sha256, formats):
+    return [
+        (width, ext) for width in THUMB_WIDTHS for ext in formats
+        if not os.path.exists(os.path.join(thumbs_dir, thumb_name(sha256, width, ext)))
+    ]
+
+def render_thumbs(job):
+    """Worker: encode every missing width/format for one image (runs in a separate process)"""
+    sha256, data, wanted, thumbs_dir = job
+    with Image.open(io.BytesIO(data)) as img:
+        img = img.convert("RGB")
+        for width, ext in wanted:
+            height = round(img.height * width / img.width)
+            thumb = img.resize((width, height), Image.Resampling.LANCZOS)
+            path = os.path.join(thumbs_dir, thumb_name(sha256, width, ext))
+            thumb.save(path + ".tmp", format=ext.upper(), quality=THUMB_QUALITY)
+            os.replace(path + ".tmp", path)
+    return sha256, len(wanted)
+
+def render_figure(entry, formats):
+    sha256 = entry["sha256"]
+    sources = []
+    for ext in formats:
+        srcset = ", ".join(f"thumbs/{thumb_name(sha256, w, ext)} {w}w" for w in THUMB_WIDTHS)
+        if ext == "webp":
+            img_srcset = srcset
+        else:
+            sources.append(f'<source type="image/{ext}" srcset="{srcset}" sizes="(max-width: 600px) 50vw, 240px">')
+    alt = html.escape(entry.get("alt_text") or f"Generated {entry['animal']} image")
+    height = round(entry["height"] * THUMB_WIDTHS[1] / entry["width"])
+    return (
+        f'<figure><a href="{RAW_BASE_URL}{entry["path"]}"><picture>{"".join(sources)}'
+        f'<img src="thumbs/{thumb_name(sha256, THUMB_WIDTHS[1], "webp")}" srcset="{img_srcset}" '
+        f'sizes="(max-width: 600px) 50vw, 240px" width="{THUMB_WIDTHS[1]}" height="{height}" '
+        f'loading="lazy" decoding="async" alt="{alt}"></picture></a>'
+        f'<figcaption>{html.escape(entry["animal"])} &middot; {html.escape(entry["created_at"][:10])}</figcaption></figure>'
+    )
+
+def page_name(page):
+    return "index.html" if page == 1 else f"page-{page}.html"
+
+def render_page(entries, page, pages, formats):
+    nav = []
+    if page > 1:
+        nav.append(f'<a href="{page_name(page - 1)}">&larr; Newer</a>')
+    nav.append(f"Page {page} of {pages}")
+    if page < pages:
+        nav.append(f'<a href="{page_name(page + 1)}">Older &rarr;</a>')
+    nav_html = f'<nav>{" | ".join(nav)}</nav>'
+    figures = "\n        ".join(render_figure(entry, formats) for entry in entries)
+    return f"""<!DOCTYPE html>
+<html lang="en">
+<head>
+    <meta charset="UTF-8">
+    <meta name="viewport" content="width=device-width, initial-scale=1.0">
+    <title>Gallery - Friendly AI Accounts for BlueSky by Closetemail.com</title>
+    <style>
+        body {{
+            font-family: Arial, sans-serif;
+            line-height: 1.6;
+            background-color: #161e27;
+            color: #f4f4f4;
+            max-width: 1040px;
+            margin: auto;
+            padding: 20px;
+        }}
+        a {{
+            color: #3498db;
+            text-decoration: none;
+        }}
+        .grid {{
+            display: grid;
+            grid-template-columns: repeat(auto-fill, minmax(160px, 1fr));
+            gap: 12px;
+        }}
+        figure {{
+            margin: 0;
+        }}
+        img {{
+            width: 100%;
+            height: auto;
+            border-radius: 4px;
+        }}
+        figcaption {{
+            font-size: 0.8em;
+            color: #a0a0a0;
+        }}
+    </style>
+</head>
+<body>
+    <h1>OnlyKittens &amp; OnlyPuppies Gallery</h1>
+    <p><a href="../index.html">&larr; Back to closetemail.com</a></p>
+    {nav_html}
+    <div class="grid">
+        {figures}
+    </div>
+    {nav_html}
+</body>
+<footer>closetemail.com - privacy in your hands | Visit us on <a href="https://github.com/appatalks/closetemail.com">GitHub.com</a></footer>
+</html>
+"""
+
+def load_image(entry, archive_dir, archiver, tip):
+    """Full-size image bytes, or None if the archive does not have it"""
+    if archive_dir:
+        try:
+            with open(os.path.join(archive_dir, entry["path"]), "rb") as f:
+                return f.read()
+        except FileNotFoundError:
+            return None
+    return archiver.read_file(tip, entry["path"])
+
+def build(manifest, out_dir=GALLERY_DIR, archive_dir=None, workers=None, archiver=None, tip=None):
+    """Render thumbnails for new images only, then rewrite the gallery pages.
+
+    Without archive_dir, images are read from archiver at tip (the commit the
+    manifest came from). Entries whose thumbnails could not be made are left
+    off the pages.
+    """
+    thumbs_dir = os.path.join(out_dir, "thumbs")
+    os.makedirs(thumbs_dir, exist_ok=True)
+    formats = thumb_formats()
+    entries = sorted(manifest["images"], key=lambda e: e["created_at"], reverse=True)
+
+    if not archive_dir and archiver is None:
+        archiver = GitArchiver()
+        tip = archiver.fetch_tip()
+
+    def jobs():
+        for entry in entries:
+            wanted = missing_thumbs(thumbs_dir, entry["sha256"], formats)
+            if wanted:
+                data = load_image(entry, archive_dir, archiver, tip)
+                if data:
+                    yield entry["sha256"], data, wanted, thumbs_dir
+
+    # Keep only a couple of jobs per worker in flight, so full-size images are
+    # loaded as workers free up rather than all at once.
+    rendered = 0
+    workers = workers or os.cpu_count() or 1
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        in_flight = set()
+        for job in jobs():
+            if len(in_flight) >= workers * 2:
+                done, in_flight = wait(in_flight, return_when=FIRST_COMPLETED)
+                rendered += sum(future.result()[1] for future in done)
+            in_flight.add(pool.submit(render_thumbs, job))
+        rendered += sum(future.result()[1] for future in in_flight)
+
+    shown = []
+    for entry in entries:
+        if missing_thumbs(thumbs_dir, entry["sha256"], formats):
+            print(f"Skipping {entry['path']}: image not found in the archive")
+        else:
+            shown.append(entry)
+    entries = shown
+    pages = max(1, -(-len(entries) // PAGE_SIZE))
+    for page in range(1, pages + 1):
+        chunk = entries[(page - 1) * PAGE_SIZE:page * PAGE_SIZE]
+        with open(os.path.join(out_dir, page_name(page)), "w") as f:
+            f.write(render_page(chunk, page, pages, formats))
+    print(f"Gallery: {len(entries)} image(s), {pages} page(s), {rendered} new thumbnail(s)")
+    return rendered
+
+def main():
+    parser = argparse.ArgumentParser(description="Build the static image gallery under docs/gallery.")
+    parser.add_argument("--manifest", help="Local manifest.json (default: read from the generated branch)", default=None)
+    parser.add_argument("--archive-dir", help="Checkout of the generated branch to read images from", default=None)
+    parser.add_argument("--out", help="Output directory", default=GALLERY_DIR)
+    parser.add_argument("--workers", type=int, help="Thumbnail encoder processes (default: one per core)", default=None)
+    args = parser.parse_args()
+
+    manifest_path = args.manifest
+    if not manifest_path and args.archive_dir:
+        candidate = os.path.join(args.archive_dir, MANIFEST_PATH)
+        manifest_path = candidate if os.path.exists(candidate) else None
+    archiver = tip = None
+    if not args.archive_dir:
+        # Fetched once: the manifest and every image are read at the same commit
+        archiver = GitArchiver()
+        tip = archiver.fetch_tip()
+    if manifest_path or archiver is None:
+        manifest = load_manifest(path=manifest_path)
+    else:
+        manifest = parse_manifest(archiver.read_file(tip, MANIFEST_PATH))
+    build(manifest, args.out, args.archive_dir, args.workers, archiver, tip)
+
+if __name__ == "__main__":
+    main()
@@ -4,13 +4,19 @@ import argparse
 import os
 import json
 import sys
+from http_pool import get_session
+from bsky_auth import login
+import metrics
+import profiling
+import log_sink
+import alert_rules
 
 # Constants
 USGS_URL = "https://earthquake.usgs.gov/fdsnws/event/1/query"
 SAFECAST_URL = "https://api.safecast.org/measurements.json"
-MAG_THRESHOLD = 1.0  # Minimum magnitude
-DEPTH_THRESHOLD = 2.0  # Maximum depth (in km)
-RADIATION_SPIKE_THRESHOLD_CPM = 125  # Threshold for radiation in CPM
+PDS_URL = "https://bsky.social"
+RULES_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "alert_rules.json")  # Monitoring thresholds
+RADIATION_SPIKE_THRESHOLD_CPM = 125  # Threshold for radiation in CPM (simulation mode)
 REQUEST_TIMEOUT = 15  # Timeout for API requests in seconds
 
 # Debug levels
@@ -50,10 +56,12 @@ def debug_print(level, message):
         DEBUG_DETAIL: "[DETAIL]",
         DEBUG_TRACE: "[TRACE]"
     }
+    if level > DEBUG_LEVEL:
+        return  # Skip sanitising and formatting messages that would be discarded
     sanitized_message = sanitize_message(message)
-    if level <= DEBUG_LEVEL and level in levels:
+    if level in levels:
         print(f"{levels[level]} {sanitized_message}")
-    elif level <= DEBUG_LEVEL:
+    else:
         print(f"[DEBUG-{level}] {sanitized_message}")
 
 def pretty_json(data):
@@ -63,24 +71,18 @@ def pretty_json(data):
 # Bluesky API Functions
 def bsky_login_session(pds_url: str, handle: str, password: str):
     debug_print(DEBUG_INFO, f"Attempting Bluesky login with handle: {handle}")
-    payload = {"identifier": handle, "password": "***"}  # Mask password in payload
     debug_print(DEBUG_TRACE, f"Login payload: {json.dumps({'identifier': handle, 'password': '***'})}")
     
     try:
-        debug_print(DEBUG_DETAIL, f"Sending login request to {pds_url}/xrpc/com.atproto.server.createSession")
-        resp = requests.post(
-            pds_url + "/xrpc/com.atproto.server.createSession",
-            json=payload,
-        )
-        resp.raise_for_status()
+        debug_print(DEBUG_DETAIL, f"Sending login request to {pds_url}/xrpc/com.atproto.server.createSession (cached per account)")
+        session_data = login(pds_url, handle, password)
         debug_print(DEBUG_INFO, f"Bluesky login successful for {handle}")
-        session_data = resp.json()
         debug_print(DEBUG_TRACE, f"Received session data with DID: {session_data.get('did', 'unknown')}")
         return session_data
     except requests.exceptions.HTTPError as e:
         debug_print(DEBUG_ERROR, f"HTTP Error during Bluesky login: {e}")
-        debug_print(DEBUG_ERROR, f"Response Status Code: {resp.status_code}")
-        debug_print(DEBUG_ERROR, f"Response Content: {resp.text}")
+        debug_print(DEBUG_ERROR, f"Response Status Code: {e.response.status_code}")
+        debug_print(DEBUG_ERROR, f"Response Content: {e.response.text}")
         raise
     except Exception as e:
         debug_print(DEBUG_ERROR, f"Unexpected error during Bluesky login: {str(e)}")
@@ -108,7 +110,7 @@ def create_bsky_post(session, pds_url, post_content, embed=None):
         debug_print(DEBUG_TRACE, f"Post request payload: {pretty_json(payload)}")
         
         debug_print(DEBUG_DETAIL, f"Sending post request to {pds_url}/xrpc/com.atproto.repo.createRecord")
-        resp = requests.post(
+        resp = get_session().post(
             pds_url + "/xrpc/com.atproto.repo.createRecord",
             headers={"Authorization": "Bearer " + session["accessJwt"]},
             json=payload,
@@ -129,7 +131,7 @@ def create_bsky_post(session, pds_url, post_content, embed=None):
 # Combined Posting Function
 def post_to_bsky(post_type, lat, lon, magnitude=None, depth=None, radiation_level=None, radiation_unit=None, radiation_time=None):
     debug_print(DEBUG_INFO, f"Preparing to post to Bluesky, post type: {post_type}")
-    pds_url = "https://bsky.social"
+    pds_url = PDS_URL
     handle = os.getenv("BLUESKY_CLOSET_H")
     password = os.getenv("BLUESKY_CLOSET_P")
     
@@ -137,7 +139,8 @@ def post_to_bsky(post_type, lat, lon, magnitude=None, depth=None, radiation_leve
         debug_print(DEBUG_ERROR, "Missing Bluesky credentials in environment variables")
         return
 
-    session = bsky_login_session(pds_url, handle, password)
+    with metrics.timer(stage="login"):
+        session = bsky_login_session(pds_url, handle, password)
 
     if post_type == "simulation":
         debug_print(DEBUG_INFO, f"Creating simulation post for coordinates: ({lat}, {lon})")
@@ -162,7 +165,9 @@ def post_to_bsky(post_type, lat, lon, magnitude=None, depth=None, radiation_leve
         return
 
     debug_print(DEBUG_DETAIL, f"Final post content: {post_content}")
-    create_bsky_post(session, pds_url, post_content)
+    with metrics.timer(stage="post"):
+        create_bsky_post(session, pds_url, post_content)
+    metrics.counter("posts", type=post_type)
 
 # Seismic and Radiation Functions
 def get_usgs_events():
@@ -180,7 +185,7 @@ def get_usgs_events():
     
     try:
         debug_print(DEBUG_TRACE, "Sending request to USGS API...")
-        response = requests.get(USGS_URL, params=params, timeout=REQUEST_TIMEOUT)
+        response = get_session().get(USGS_URL, params=params, timeout=REQUEST_TIMEOUT)
         response.raise_for_status()
         data = response.json()
         
@@ -227,7 +232,7 @@ def get_nearest_radiation_sample(lat, lon):
     
     try:
         debug_print(DEBUG_TRACE, "Sending request to Safecast API...")
-        response = requests.get(SAFECAST_URL, params=params, timeout=REQUEST_TIMEOUT)
+        response = get_session().get(SAFECAST_URL, params=params, timeout=REQUEST_TIMEOUT)
         response.raise_for_status()
         
         # Debug: Log the raw response content at TRACE level
@@ -284,7 +289,7 @@ def get_nearest_radiation_sample(lat, lon):
         return None, None, None
 
 # Main Function
-def main(simulate_lat=None, simulate_lon=None, simulate_radiation=None):
+def main(simulate_lat=None, simulate_lon=None, simulate_radiation=None, rules_path=None):
     debug_print(DEBUG_INFO, "Starting nuclear event monitoring process")
     
     # Simulation mode
@@ -306,18 +311,31 @@ def main(simulate_lat=None, simulate_lon=None, simulate_radiation=None):
 
     # Normal monitoring mode
     debug_print(DEBUG_INFO, "Running in normal monitoring mode")
-    debug_print(DEBUG_INFO, f"Thresholds: Magnitude >= {MAG_THRESHOLD}, Depth <= {DEPTH_THRESHOLD} km, Radiation > {RADIATION_SPIKE_THRESHOLD_CPM} CPM")
+    rules_path = rules_path or RULES_PATH
+    rules = alert_rules.load_rules(rules_path)
+    debug_print(DEBUG_INFO, f"Loaded {len(rules)} alert rule(s) from {rules_path}")
+    for line in rules.describe():
+        debug_print(DEBUG_DETAIL, f"  - {line}")
     
-    events = get_usgs_events()
+    with metrics.timer(stage="usgs_fetch"):
+        events = get_usgs_events()
+    metrics.counter("events_fetched", len(events))
     if not events:
         debug_print(DEBUG_INFO, "No seismic events detected in the monitoring window")
         return
 
     debug_print(DEBUG_INFO, f"Processing {len(events)} seismic events")
-    
+
+    # Screen the whole batch against every rule at once
+    with metrics.timer(stage="screening"):
+        matches = rules.screen(events)
+    metrics.counter("events_examined", len(events))
+    metrics.counter("events_matched", len(matches))
+    debug_print(DEBUG_INFO, f"{len(matches)} event(s) meet the seismic criteria of at least one rule")
+
     # Process all events, not just the first one
     events_examined = 0
-    for event in events:
+    for index, event in enumerate(events):
         events_examined += 1
         props = event["properties"]
         geo = event["geometry"]["coordinates"]
@@ -333,28 +351,33 @@ def main(simulate_lat=None, simulate_lon=None, simulate_radiation=None):
         debug_print(DEBUG_DETAIL, f"  - Time: {event_time}")
         
         # Check if this event meets the seismic criteria for a potential nuclear event
-        if isinstance(magnitude, (int, float)) and magnitude >= MAG_THRESHOLD and depth <= DEPTH_THRESHOLD:
-            debug_print(DEBUG_WARNING, f"Event meets seismic criteria: Magnitude {magnitude} >= {MAG_THRESHOLD} and Depth {depth} km <= {DEPTH_THRESHOLD} km")
+        matched_rules = matches.get(index)
+        if matched_rules:
+            # Any matching rule can raise the alert, so the lowest radiation threshold applies
+            radiation_threshold = min(rule.radiation_cpm_above for rule in matched_rules)
+            debug_print(DEBUG_WARNING, f"Event meets seismic criteria of rule(s) {', '.join(rule.name for rule in matched_rules)}: Magnitude {magnitude}, Depth {depth} km")
             
             # Now check for radiation levels near the event
             debug_print(DEBUG_INFO, f"Checking radiation levels near ({lat}, {lon})")
-            radiation_level, radiation_unit, radiation_time = get_nearest_radiation_sample(lat, lon)
+            with metrics.timer(stage="safecast_lookup"):
+                radiation_level, radiation_unit, radiation_time = get_nearest_radiation_sample(lat, lon)
+            metrics.counter("radiation_lookups")
             
             if radiation_level is not None:
                 debug_print(DEBUG_DETAIL, f"Found radiation level: {radiation_level} {radiation_unit} at {radiation_time}")
                 
-                if radiation_level > RADIATION_SPIKE_THRESHOLD_CPM:
-                    debug_print(DEBUG_WARNING, f"ALERT: Radiation level {radiation_level} {radiation_unit} exceeds threshold of {RADIATION_SPIKE_THRESHOLD_CPM} CPM!")
+                if radiation_level > radiation_threshold:
+                    debug_print(DEBUG_WARNING, f"ALERT: Radiation level {radiation_level} {radiation_unit} exceeds threshold of {radiation_threshold:g} CPM!")
                     debug_print(DEBUG_WARNING, f"ALERT: Possible nuclear detonation detected at ({lat}, {lon})!")
                     
                     post_to_bsky("alert", lat, lon, magnitude, depth, radiation_level, radiation_unit, radiation_time)
                     return  # Stop after posting an alert
                 else:
-                    debug_print(DEBUG_INFO, f"Radiation level {radiation_level} {radiation_unit} does not exceed threshold of {RADIATION_SPIKE_THRESHOLD_CPM} CPM")
+                    debug_print(DEBUG_INFO, f"Radiation level {radiation_level} {radiation_unit} does not exceed threshold of {radiation_threshold:g} CPM")
             else:
                 debug_print(DEBUG_WARNING, f"Could not retrieve radiation data for location ({lat}, {lon})")
         else:
-            debug_print(DEBUG_DETAIL, f"Event does not meet seismic criteria (requires mag >= {MAG_THRESHOLD} and depth <= {DEPTH_THRESHOLD} km)")
+            debug_print(DEBUG_DETAIL, "Event does not meet the seismic criteria of any alert rule")
     
     debug_print(DEBUG_INFO, "Monitoring complete - No significant events detected")
 
@@ -364,9 +387,16 @@ if __name__ == "__main__":
     parser.add_argument("--simulate-lon", type=str, help="Longitude for simulated event", default=None)
     parser.add_argument("--simulate-radiation", type=str, help="Simulated radiation level", default=None)
     parser.add_argument("--debug-level", type=int, help="Debug level (0-5)", default=DEBUG_INFO)
+    parser.add_argument("--rules", type=str, help=f"Alert rules JSON file (default: {os.path.relpath(RULES_PATH)})", default=None)
     parser.add_argument("--output", type=str, help="Output debug to file", default=None)
+    parser.add_argument("--output-max-bytes", type=int, help="Rotate the --output file at this size; rotated files are gzipped", default=log_sink.MAX_BYTES)
+    parser.add_argument("--output-max-age", type=float, metavar="SECONDS", help="Also rotate the --output file after this many seconds", default=None)
+    parser.add_argument("--metrics-dir", type=str, help="Write per-run metrics (JSON and Prometheus text) to this directory", default=None)
+    parser.add_argument("--profile", nargs="?", const=profiling.PROFILE_DIR, metavar="DIR", help="Profile the run (cProfile, tracemalloc, collapsed stacks) and write reports to DIR (default: profile)", default=None)
     args = parser.parse_args()
     
+    metrics.configure("nuclear", args.metrics_dir)
+
     # Set debug level from command line
     DEBUG_LEVEL = args.debug_level
     debug_print(DEBUG_INFO, f"Debug level set to {DEBUG_LEVEL}")
@@ -374,7 +404,8 @@ if __name__ == "__main__":
     # Set up file output if requested
     if args.output:
         try:
-            sys.stdout = open(args.output, 'w')
+            # Writes go through a background thread, so heavy TRACE logging doesn't stall detection
+            log_sink.install(args.output, max_bytes=args.output_max_bytes, max_age=args.output_max_age)
             debug_print(DEBUG_INFO, f"Debug output will be written to {args.output}")
         except Exception as e:
             print(f"Error setting up output file: {str(e)}")
@@ -385,7 +416,8 @@ if __name__ == "__main__":
     debug_print(DEBUG_DETAIL, f"Running on: {sys.platform}")
     
     try:
-        main(simulate_lat=args.simulate_lat, simulate_lon=args.simulate_lon, simulate_radiation=args.simulate_radiation)
+        profiling.run("nuclear", args.profile, main,
+                      simulate_lat=args.simulate_lat, simulate_lon=args.simulate_lon, simulate_radiation=args.simulate_radiation, rules_path=args.rules)
         debug_print(DEBUG_INFO, "Script completed successfully")
     except Exception as e:
         debug_print(DEBUG_ERROR, f"Script failed with error: {str(e)}")
@@ -0,0 +1,224 @@
+import os
+import sys
+import json
+import base64
+import math
+import time
+import random
+import argparse
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlsplit, parse_qs
+
+import check_nuclear_events
+from http_pool import get_session
+
+WINDOW_MINUTES = 15  # Synthetic events fall inside the monitor's USGS window
+SPIKE_RADIUS_KM = 50  # Safecast lookups this close to a spike site report elevated readings
+BACKGROUND_CPM = (20, 60)
+SPIKE_CPM = (400, 2000)
+EARTH_RADIUS_KM = 6371
+
+def gutenberg_richter(rng, m_min=0.5, b=1.0, m_max=8.0):
+    """Magnitude with the usual exponential frequency falloff (b-value 1)"""
+    return round(min(m_max, m_min - math.log10(1 - rng.random()) / b), 1)
+
+def random_location(rng):
+    # Uniform over the sphere rather than over lat/lon
+    return math.degrees(math.asin(2 * rng.random() - 1)), rng.uniform(-180, 180)
+
+def offset(lat, lon, km, rng):
+    """A point roughly km away in a random direction"""
+    bearing = rng.uniform(0, 2 * math.pi)
+    dlat = km * math.cos(bearing) / 111.0
+    dlon = km * math.sin(bearing) / (111.0 * max(0.01, math.cos(math.radians(lat))))
+    return max(-90.0, min(90.0, lat + dlat)), (lon + dlon + 180) % 360 - 180
+
+def distance_km(lat1, lon1, lat2, lon2):
+    p1, p2 = math.radians(lat1), math.radians(lat2)
+    dp, dl = p2 - p1, math.radians(lon2 - lon1)
+    a = math.sin(dp / 2) ** 2 + math.cos(p1) * math.cos(p2) * math.sin(dl / 2) ** 2
+    return 2 * EARTH_RADIUS_KM * math.asin(math.sqrt(a))
+
+def feature(event_id, lat, lon, depth, mag, when_ms, place):
+    return {
+        "type": "Feature",
+        "id": event_id,
+        "properties": {
+            "mag": mag, "place": place, "time": when_ms, "updated": when_ms,
+            "type": "earthquake", "title": f"M {mag} - {place}",
+        },
+        "geometry": {"type": "Point", "coordinates": [round(lon, 4), round(lat, 4), round(depth, 2)]},
+    }
+
+def build_storm(count, swarms, spikes, seed, now=None):
+    """Return (USGS FeatureCollection, spike sites) for a synthetic event storm.
+
+    About half the events are background seismicity spread over the globe;
+    the rest are aftershock swarms around `swarms` shallow mainshocks, with
+    Omori-like decay in time. The first `spikes` swarms get a radiation spike
+    at their epicentre.
+    """
+    rng = random.Random(seed)
+    now_ms = int((now or time.time()) * 1000)
+    window_ms = WINDOW_MINUTES * 60 * 1000
+    features = []
+    swarm_count = count // 2 if swarms else 0
+    for i in range(count - swarm_count):
+        lat, lon = random_location(rng)
+        depth = rng.expovariate(1 / 15)
+        features.append(feature(f"bg{i}", lat, lon, depth, gutenberg_richter(rng), now_ms - rng.randrange(window_ms), "synthetic background"))
+
+    sites = []
+    for s in range(swarms):
+        lat, lon = random_location(rng)
+        start = now_ms - rng.randrange(window_ms // 2, window_ms)
+        features.append(feature(f"sw{s}-main", lat, lon, rng.uniform(0.2, 1.5), round(rng.uniform(4.5, 6.5), 1), start, f"synthetic swarm {s} mainshock"))
+        if s < spikes:
+            sites.append((lat, lon))
+        aftershocks = (swarm_count - swarms) // swarms + (s < (swarm_count - swarms) % swarms)
+        for k in range(aftershocks):
+            # Omori: aftershock rate ~ 1/(t + c), sampled by inverse transform
+            elapsed = 1000 * (math.exp(rng.random() * math.log((now_ms - start) / 1000 + 1)) - 1)
+            a_lat, a_lon = offset(lat, lon, rng.expovariate(1 / 5), rng)
+            features.append(feature(f"sw{s}-{k}", a_lat, a_lon, rng.expovariate(1 / 3), gutenberg_richter(rng), int(start + elapsed), f"synthetic swarm {s}"))
+
+    features.sort(key=lambda f: -f["properties"]["time"])  # USGS returns newest first
+    collection = {
+        "type": "FeatureCollection",
+        "metadata": {"generated": now_ms, "title": "Synthetic event storm", "count": len(features)},
+        "features": features,
+    }
+    return collection, sites
+
+def safecast_payload(lat, lon, sites, rng):
+    """Measurements near (lat, lon): elevated within SPIKE_RADIUS_KM of a spike site, background otherwise"""
+    spiking = any(distance_km(lat, lon, s_lat, s_lon) <= SPIKE_RADIUS_KM for s_lat, s_lon in sites)
+    low, high = SPIKE_CPM if spiking else BACKGROUND_CPM
+    captured = time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime())
+    return [
+        {"id": rng.randrange(10 ** 9), "value": round(rng.uniform(low, high), 1), "unit": "cpm",
+         "latitude": round(m_lat, 4), "longitude": round(m_lon, 4), "captured_at": captured}
+        for m_lat, m_lon in (offset(lat, lon, rng.uniform(0, 10), rng) for _ in range(3))
+    ]
+
+class StormServer(ThreadingHTTPServer):
+    """Local stand-in for USGS, Safecast and the Bluesky PDS that counts what it is asked for"""
+    daemon_threads = True
+
+    def __init__(self, collection, sites, seed):
+        super().__init__(("127.0.0.1", 0), StormHandler)
+        self.body = json.dumps(collection).encode()
+        self.sites = sites
+        self.rng = random.Random(seed)
+        self.lock = threading.Lock()
+        self.counts = {"usgs": 0, "safecast": 0, "session": 0, "post": 0}
+        self.first_post = None
+        self.posts = []
+
+    @property
+    def url(self):
+        return f"http://127.0.0.1:{self.server_address[1]}"
+
+    def count(self, key):
+        with self.lock:
+            self.counts[key] += 1
+
+class StormHandler(BaseHTTPRequestHandler):
+    def log_message(self, format, *args):
+        pass  # Keep thousands of requests out of the report
+
+    def _send(self, payload, status=200):
+        body = payload if isinstance(payload, bytes) else json.dumps(payload).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self):
+        url = urlsplit(self.path)
+        if url.path == "/fdsnws/event/1/query":
+            self.server.count("usgs")
+            self._send(self.server.body)
+        elif url.path == "/measurements.json":
+            self.server.count("safecast")
+            query = parse_qs(url.query)
+            lat, lon = float(query["latitude"][0]), float(query["longitude"][0])
+            with self.server.lock:
+                payload = safecast_payload(lat, lon, self.server.sites, self.server.rng)
+            self._send(payload)
+        else:
+            self._send({"error": "NotFound"}, 404)
+
+    def do_POST(self):
+        length = int(self.headers.get("Content-Length") or 0)
+        body = json.loads(self.rfile.read(length) or b"{}")
+        if self.path == "/xrpc/com.atproto.server.createSession":
+            self.server.count("session")
+            claims = base64.urlsafe_b64encode(json.dumps({"exp": int(time.time()) + 3600}).encode()).decode().rstrip("=")
+            token = f"e30.{claims}.storm"  # Unsigned; bsky_auth only reads exp
+            self._send({"did": "did:plc:storm", "handle": body.get("identifier"), "accessJwt": token, "refreshJwt": token})
+        elif self.path == "/xrpc/com.atproto.repo.createRecord":
+            self.server.count("post")
+            with self.server.lock:
+                if self.server.first_post is None:
+                    self.server.first_post = time.perf_counter()
+                self.server.posts.append(body.get("record", {}).get("text", ""))
+            self._send({"uri": f"at://did:plc:storm/app.bsky.feed.post/{len(self.server.posts)}", "cid": "storm"})
+        else:
+            self._send({"error": "NotFound"}, 404)
+
+def run_storm(args):
+    collection, sites = build_storm(args.events, args.swarms, args.spikes, args.seed)
+    server = StormServer(collection, sites, args.seed)
+    threading.Thread(target=server.serve_forever, name="storm-server", daemon=True).start()
+
+    # Point the monitor at the stub; the credentials only ever reach 127.0.0.1
+    monitor = check_nuclear_events
+    monitor.USGS_URL = server.url + "/fdsnws/event/1/query"
+    monitor.SAFECAST_URL = server.url + "/measurements.json"
+    monitor.PDS_URL = server.url
+    monitor.DEBUG_LEVEL = args.debug_level
+    os.environ["BLUESKY_CLOSET_H"] = "storm.test"
+    os.environ["BLUESKY_CLOSET_P"] = "storm"
+    os.environ.pop("BSKY_SESSION_CACHE", None)
+    if args.rate:
+        get_session().scheduler.default_rate = get_session().scheduler.default_burst = args.rate
+
+    print(f"Storm: {len(collection['features'])} events, {args.swarms} swarm(s), {len(sites)} radiation spike(s), stub at {server.url}")
+    start = time.perf_counter()
+    monitor.main(rules_path=args.rules)
+    elapsed = time.perf_counter() - start
+    server.shutdown()
+
+    counts = server.counts
+    events = len(collection["features"])
+    print(f"Elapsed:            {elapsed:.2f}s")
+    print(f"Events/second:      {events / elapsed:,.0f}")
+    print(f"USGS fetches:       {counts['usgs']}")
+    print(f"Safecast lookups:   {counts['safecast']}")
+    print(f"Logins:             {counts['session']}")
+    print(f"Alerts posted:      {counts['post']}")
+    if server.first_post is not None:
+        print(f"Time to first alert: {server.first_post - start:.2f}s")
+    else:
+        print("Time to first alert: no alert" + (" (expected one)" if sites else ""))
+    return 0 if bool(sites) == bool(counts["post"]) else 1
+
+def main():
+    parser = argparse.ArgumentParser(description="Drive the nuclear monitor with a synthetic event storm served from a local stub.")
+    parser.add_argument("--events", type=int, default=5000, help="Total synthetic USGS events")
+    parser.add_argument("--swarms", type=int, default=3, help="Aftershock swarms (half the events are aftershocks)")
+    parser.add_argument("--spikes", type=int, default=1, help="Swarms that also get a radiation spike (0 for a no-alert run)")
+    parser.add_argument("--seed", type=int, default=1, help="Random seed, for repeatable storms")
+    parser.add_argument("--rules", type=str, default=None, help="Alert rules JSON file (default: the monitor's)")
+    parser.add_argument("--rate", type=float, default=None, help="Override the per-host request rate limit (requests/second)")
+    parser.add_argument("--debug-level", type=int, default=check_nuclear_events.DEBUG_ERROR, help="Monitor debug level (0-5)")
+    args = parser.parse_args()
+    if args.spikes > args.swarms:
+        parser.error("--spikes cannot exceed --swarms")
+    return run_storm(args)
+
+if __name__ == "__main__":
+    sys.exit(main())
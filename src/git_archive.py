@@ -0,0 +1,211 @@
+import os
+import random
+import hashlib
+import tempfile
+import subprocess
+import threading
+import time
+from typing import Callable, Dict, Optional, Union
+
+BRANCH = "generated"
+REMOTE = "origin"
+MAX_PUSH_ATTEMPTS = 5
+RETRY_DELAY = 1.0  # Seconds, doubled (with jitter) after each rejected push
+SCRATCH_DIR = "closetbots-archive"  # Under $RUNNER_TEMP (or the system temp dir)
+
+# Commit as the Actions bot without touching the global git config
+COMMIT_IDENTITY = {
+    "GIT_AUTHOR_NAME": "GitHub Actions",
+    "GIT_AUTHOR_EMAIL": "actions@github.com",
+    "GIT_COMMITTER_NAME": "GitHub Actions",
+    "GIT_COMMITTER_EMAIL": "actions@github.com",
+}
+
+FileMap = Dict[str, Union[bytes, memoryview]]
+
+# Bots sharing one process (run_bots.py) also share one scratch repo; git refs
+# and the shallow file cannot be updated concurrently, so commits are serialized.
+_repo_lock = threading.Lock()
+_scratch_lock = threading.Lock()
+
+class PushRejected(Exception):
+    pass
+
+class GitArchiver:
+    """Commit files to a branch with git plumbing, never touching the work tree.
+
+    Blobs are written with hash-object, trees are rebuilt with mktree only
+    along the directories that change, and the commit is pushed fast-forward
+    only. A rejected push (someone else committed first) is retried on top of
+    the new tip, so concurrent bot runs never overwrite each other. The fetch
+    is shallow and blob-less, so its cost does not grow with the branch.
+
+    A shallow, filtered fetch permanently turns a clone into a shallow
+    promisor repo, so all of this happens in a scratch bare repo with the
+    same remote URL and credentials. The checkout in repo is only read from.
+    """
+
+    def __init__(self, branch=BRANCH, remote=REMOTE, repo="."):
+        self.branch = branch
+        self.remote = remote
+        self.repo = repo
+        self.scratch: Optional[str] = None
+        self.pending: FileMap = {}
+
+    def _scratch_repo(self) -> str:
+        """Create (or reuse) the bare scratch repo for this remote and return its path"""
+        with _scratch_lock:
+            if self.scratch is None:
+                checkout = ["git", "-C", self.repo]
+                url = subprocess.run([*checkout, "remote", "get-url", self.remote],
+                                     capture_output=True, check=True).stdout.decode().strip()
+                path = os.path.join(os.getenv("RUNNER_TEMP") or tempfile.gettempdir(), SCRATCH_DIR,
+                                    hashlib.sha1(url.encode()).hexdigest()[:12])
+                if not os.path.isdir(path):
+                    subprocess.run(["git", "init", "--quiet", "--bare", path], capture_output=True, check=True)
+                scratch = ["git", "-C", path, "config"]
+                subprocess.run([*scratch, f"remote.{self.remote}.url", url], capture_output=True, check=True)
+                # actions/checkout keeps the token in the clone's config as an extraheader
+                headers = subprocess.run([*checkout, "config", "--get-regexp", r"^http\..*\.extraheader$"],
+                                         capture_output=True).stdout.decode().splitlines()
+                for line in headers:
+                    key, _, value = line.partition(" ")
+                    subprocess.run([*scratch, "--replace-all", key, value], capture_output=True, check=True)
+                self.scratch = path
+            return self.scratch
+
+    def _git(self, *args, input=None, env=None) -> str:
+        full_env = None
+        if env:
+            full_env = dict(os.environ)
+            full_env.update(env)
+        result = subprocess.run(
+            ["git", "-C", self._scratch_repo(), *args],
+            input=input, env=full_env, capture_output=True, check=True,
+        )
+        return result.stdout.decode().strip()
+
+    @property
+    def remote_ref(self):
+        return f"refs/remotes/{self.remote}/{self.branch}"
+
+    def fetch_tip(self) -> Optional[str]:
+        """Fetch the branch tip (depth 1, trees only) and return its commit, or None if it does not exist yet"""
+        try:
+            self._git("fetch", "--quiet", "--depth=1", "--filter=blob:none", self.remote,
+                      f"+refs/heads/{self.branch}:{self.remote_ref}")
+        except subprocess.CalledProcessError as e:
+            if b"couldn't find remote ref" in e.stderr:
+                return None
+            raise
+        return self._git("rev-parse", self.remote_ref)
+
+    def exists(self, commit: Optional[str], path: str) -> bool:
+        """True if path (a file or directory) is in commit's tree; reads trees only, so it works blob-less"""
+        if commit is None:
+            return False
+        return bool(self._git("ls-tree", "--full-tree", commit, "--", path))
+
+    def read_file(self, commit: Optional[str], path: str) -> Optional[bytes]:
+        """Return a file's contents at commit, or None if it is not there.
+
+        Only a path missing from the tree counts as absent; a blob that cannot
+        be read (failed lazy fetch, auth or network error) raises.
+        """
+        if not self.exists(commit, path):
+            return None
+        result = subprocess.run(
+            ["git", "-C", self._scratch_repo(), "cat-file", "blob", f"{commit}:{path}"],
+            capture_output=True, check=True,
+        )
+        return result.stdout
+
+    def _hash_blob(self, data) -> str:
+        return self._git("hash-object", "-w", "--stdin", input=bytes(data))
+
+    def _write_tree(self, base_tree: Optional[str], blobs: Dict[str, str]) -> str:
+        """Return a tree equal to base_tree with blobs (path -> sha) added or replaced"""
+        entries = {}
+        if base_tree:
+            for line in self._git("ls-tree", "-z", base_tree).split("\0"):
+                if line:
+                    meta, name = line.split("\t", 1)
+                    entries[name] = meta
+
+        subdirs: Dict[str, Dict[str, str]] = {}
+        for path, sha in blobs.items():
+            head, _, rest = path.partition("/")
+            if rest:
+                subdirs.setdefault(head, {})[rest] = sha
+            else:
+                entries[head] = f"100644 blob {sha}"
+
+        for name, children in subdirs.items():
+            existing = entries.get(name)
+            child_base = existing.split()[2] if existing and existing.split()[1] == "tree" else None
+            entries[name] = f"040000 tree {self._write_tree(child_base, children)}"
+
+        listing = "".join(f"{meta}\t{name}\0" for name, meta in entries.items())
+        # --missing: blobs of untouched files are never fetched (blob-less fetch)
+        return self._git("mktree", "-z", "--missing", input=listing.encode())
+
+    def add(self, path: str, data):
+        """Stage a file for the next flush()"""
+        self.pending[path] = data
+
+    def flush(self, message: str) -> Optional[str]:
+        """Commit and push every staged file in a single commit"""
+        if not self.pending:
+            return None
+        files, self.pending = self.pending, {}
+        return self.commit(files, message)
+
+    def commit(self, files: Union[FileMap, Callable[["GitArchiver", Optional[str]], FileMap]], message: str) -> Optional[str]:
+        """Commit files on top of the remote tip and push fast-forward only.
+
+        files may be a callable taking (archiver, tip) so content derived from
+        the branch (an index or manifest) is rebuilt against each new tip when
+        a push has to be retried. Returns None, without pushing, if the files
+        would not change the tip's tree.
+        """
+        with _repo_lock:
+            return self._commit(files, message)
+
+    def _commit(self, files, message) -> Optional[str]:
+        blob_cache = {}  # path -> (data, sha); unchanged content is not re-hashed on retry
+        delay = RETRY_DELAY
+        for attempt in range(1, MAX_PUSH_ATTEMPTS + 1):
+            tip = self.fetch_tip()
+            contents = files(self, tip) if callable(files) else files
+            blobs = {}
+            for path, data in contents.items():
+                cached = blob_cache.get(path)
+                if cached is None or cached[0] is not data:
+                    cached = blob_cache[path] = (data, self._hash_blob(data))
+                blobs[path] = cached[1]
+
+            base_tree = self._git("rev-parse", f"{tip}^{{tree}}") if tip else None
+            tree = self._write_tree(base_tree, blobs)
+            if tree == base_tree:
+                return None  # Nothing changed; an empty commit would only clutter the branch
+            parents = ["-p", tip] if tip else []
+            commit = self._git("commit-tree", tree, *parents, "-m", message, env=COMMIT_IDENTITY)
+            try:
+                self._push(commit)
+                return commit
+            except PushRejected:
+                if attempt == MAX_PUSH_ATTEMPTS:
+                    raise
+                time.sleep(delay * (0.5 + random.random()))
+                delay *= 2
+
+    def _push(self, commit: str):
+        result = subprocess.run(
+            ["git", "-C", self._scratch_repo(), "push", "--quiet", self.remote, f"{commit}:refs/heads/{self.branch}"],
+            capture_output=True,
+        )
+        if result.returncode != 0:
+            stderr = result.stderr.decode()
+            if "rejected" in stderr or "fetch first" in stderr or "non-fast-forward" in stderr:
+                raise PushRejected(stderr)
+            raise subprocess.CalledProcessError(result.returncode, result.args, result.stdout, result.stderr)
@@ -0,0 +1,43 @@
+import threading
+import requests
+from requests.adapters import HTTPAdapter
+from rate_limit import RequestScheduler
+
+POOL_SIZE = 8  # Keep-alive connections per host; enough for four concurrent uploads and the post
+
+_session = None
+_session_lock = threading.Lock()
+
+class ScheduledSession(requests.Session):
+    """requests.Session that routes every call through a shared RequestScheduler.
+
+    Pass deadline=<seconds> to any request to bound how long it may wait for
+    rate limits and retries.
+    """
+
+    def __init__(self, scheduler=None):
+        super().__init__()
+        self.scheduler = scheduler or RequestScheduler()
+
+    def request(self, method, url, *args, deadline=None, **kwargs):
+        body = kwargs.get("data")
+        rewind = None
+        if hasattr(body, "seek") and hasattr(body, "tell"):
+            # Streamed file bodies have to start from the beginning on a retry
+            start = body.tell()
+            rewind = lambda: body.seek(start)
+        send = super().request
+        return self.scheduler.send(url, lambda: send(method, url, *args, **kwargs), rewind, deadline, method)
+
+def get_session() -> requests.Session:
+    """Return the process-wide session with pooled keep-alive connections and rate limiting"""
+    global _session
+    if _session is None:
+        with _session_lock:
+            if _session is None:
+                session = ScheduledSession()
+                adapter = HTTPAdapter(pool_connections=POOL_SIZE, pool_maxsize=POOL_SIZE)
+                session.mount("https://", adapter)
+                session.mount("http://", adapter)
+                _session = session
+    return _session
@@ -0,0 +1,199 @@
+import io
+import os
+import re
+import sys
+import json
+import hashlib
+import argparse
+import subprocess
+from datetime import datetime, timezone
+from typing import Dict, List, Optional
+from PIL import Image
+from git_archive import GitArchiver
+
+ARCHIVE_ROOT = "generated/archive"
+MANIFEST_PATH = f"{ARCHIVE_ROOT}/manifest.json"
+THUMB_SIZE = 256  # Longest edge of the stored thumbnail, in pixels
+THUMB_QUALITY = 70
+NEAR_DUPLICATE_DISTANCE = 10  # Max differing dHash bits (of 64) to flag two images as near-duplicates
+
+EXTENSIONS = {"JPEG": "jpg", "PNG": "png", "WEBP": "webp", "GIF": "gif", "AVIF": "avif"}
+# generated/images/generated_<animal>_<YYYYmmdd_HHMMSS>[_<n>].<ext>, written before the archive existed
+LEGACY_NAME = re.compile(r"_(\d{8}_\d{6})(?:_\d+)?\.\w+$")
+
+def dhash(img, hash_size=8) -> int:
+    """64-bit difference hash: compares neighbouring pixels of a tiny grayscale copy"""
+    small = img.convert("L").resize((hash_size + 1, hash_size), Image.Resampling.LANCZOS)
+    pixels = list(small.getdata())
+    value = 0
+    for row in range(hash_size):
+        for col in range(hash_size):
+            left = pixels[row * (hash_size + 1) + col]
+            right = pixels[row * (hash_size + 1) + col + 1]
+            value = (value << 1) | (left > right)
+    return value
+
+def hamming(a: int, b: int) -> int:
+    return bin(a ^ b).count("1")
+
+def object_path(sha256, ext):
+    # Two-character shards keep every directory small, so commits stay cheap as the archive grows
+    return f"{ARCHIVE_ROOT}/objects/{sha256[:2]}/{sha256}.{ext}"
+
+def thumb_path(sha256):
+    return f"{ARCHIVE_ROOT}/thumbs/{sha256[:2]}/{sha256}.webp"
+
+def make_thumbnail(img) -> bytes:
+    thumb = img.convert("RGB")
+    thumb.thumbnail((THUMB_SIZE, THUMB_SIZE), Image.Resampling.LANCZOS)
+    buffer = io.BytesIO()
+    thumb.save(buffer, format="WEBP", quality=THUMB_QUALITY)
+    return buffer.getvalue()
+
+def find_near_duplicate(entries, image_hash) -> Optional[str]:
+    """Return the sha256 of the closest archived image within NEAR_DUPLICATE_DISTANCE, if any"""
+    best, best_distance = None, NEAR_DUPLICATE_DISTANCE + 1
+    for entry in entries:
+        distance = hamming(int(entry["dhash"], 16), image_hash)
+        if distance < best_distance:
+            best, best_distance = entry["sha256"], distance
+    return best
+
+def _iso(when: datetime) -> str:
+    return when.isoformat().replace("+00:00", "Z")
+
+def import_timestamp(path) -> str:
+    """created_at for an imported file: the time in a legacy file name, else its last commit, else its mtime"""
+    match = LEGACY_NAME.search(os.path.basename(path))
+    if match:
+        # Stamped with the runner's clock, which is UTC on Actions
+        return _iso(datetime.strptime(match.group(1), "%Y%m%d_%H%M%S").replace(tzinfo=timezone.utc))
+    result = subprocess.run(
+        ["git", "-C", os.path.dirname(os.path.abspath(path)), "log", "-1", "--format=%at", "--", os.path.basename(path)],
+        capture_output=True,
+    )
+    stamp = result.stdout.strip() if result.returncode == 0 else b""
+    seconds = int(stamp) if stamp else os.path.getmtime(path)
+    return _iso(datetime.fromtimestamp(seconds, timezone.utc))
+
+def parse_manifest(raw) -> Dict:
+    if not raw:
+        return {"version": 1, "images": []}
+    return json.loads(raw)
+
+def dump_manifest(manifest) -> bytes:
+    # One entry per line keeps diffs on the generated branch readable
+    lines = ",\n".join("    " + json.dumps(entry, sort_keys=True) for entry in manifest["images"])
+    return f'{{\n  "version": {manifest["version"]},\n  "images": [\n{lines}\n  ]\n}}\n'.encode()
+
+class ImageArchive:
+    """Content-addressed image store on the generated branch.
+
+    Images are keyed by SHA-256, so the same bytes are only stored once. Each
+    entry in manifest.json records a dHash; an image within
+    NEAR_DUPLICATE_DISTANCE bits of an earlier one is flagged with
+    near_duplicate_of. Every entry also points at a small WebP thumbnail so the
+    archive can be listed without decoding full-size images.
+    """
+
+    def __init__(self, archiver=None):
+        self.archiver = archiver or GitArchiver()
+        self.pending: List[tuple] = []  # (entry, {path: bytes})
+
+    def add(self, data, animal, alt_text="", created_at=None) -> Dict:
+        """Stage an encoded image; returns its manifest entry"""
+        data = bytes(data)
+        sha256 = hashlib.sha256(data).hexdigest()
+        with Image.open(io.BytesIO(data)) as img:
+            ext = EXTENSIONS.get(img.format, img.format.lower())
+            width, height = img.size
+            image_hash = dhash(img)
+            thumb = make_thumbnail(img)
+        created_at = created_at or _iso(datetime.now(timezone.utc))
+        entry = {
+            "sha256": sha256,
+            "path": object_path(sha256, ext),
+            "thumb": thumb_path(sha256),
+            "animal": animal,
+            "alt_text": alt_text,
+            "created_at": created_at,
+            "width": width,
+            "height": height,
+            "bytes": len(data),
+            "dhash": f"{image_hash:016x}",
+            "near_duplicate_of": None,
+        }
+        self.pending.append((entry, {entry["path"]: data, entry["thumb"]: thumb}))
+        return entry
+
+    def _files_at(self, archiver, tip):
+        """Merge the staged entries into the manifest at tip (called again on push retries).
+
+        Returns no files if every staged image is already archived.
+        """
+        raw = archiver.read_file(tip, MANIFEST_PATH)
+        if raw is None and archiver.exists(tip, ARCHIVE_ROOT):
+            # Starting over would push a commit that drops every earlier entry
+            raise Exception(f"{MANIFEST_PATH} is missing at {tip} but the archive is not empty; refusing to rebuild it")
+        manifest = parse_manifest(raw)
+        known = {entry["sha256"] for entry in manifest["images"]}
+        files = {}
+        for entry, blobs in self.pending:
+            if entry["sha256"] in known:
+                continue  # Exact duplicate, already archived
+            entry = dict(entry, near_duplicate_of=find_near_duplicate(manifest["images"], int(entry["dhash"], 16)))
+            manifest["images"].append(entry)
+            known.add(entry["sha256"])
+            files.update(blobs)
+        if files:
+            files[MANIFEST_PATH] = dump_manifest(manifest)
+        return files
+
+    def commit(self, message) -> Optional[str]:
+        """Write every staged image, thumbnail and the updated manifest in one commit.
+
+        Returns None if there was nothing new to archive.
+        """
+        if not self.pending:
+            return None
+        commit = self.archiver.commit(self._files_at, message)
+        self.pending = []
+        return commit
+
+def load_manifest(archiver=None, path=None) -> Dict:
+    """Read the manifest from a local file, or from the tip of the generated branch"""
+    if path:
+        with open(path, "rb") as f:
+            return parse_manifest(f.read())
+    archiver = archiver or GitArchiver()
+    return parse_manifest(archiver.read_file(archiver.fetch_tip(), MANIFEST_PATH))
+
+def main():
+    parser = argparse.ArgumentParser(description="Inspect or add to the content-addressed image archive.")
+    parser.add_argument("--manifest", help="Read a local manifest.json instead of the generated branch", default=None)
+    sub = parser.add_subparsers(dest="command", required=True)
+    sub.add_parser("list", help="List archived images")
+    sub.add_parser("duplicates", help="List images flagged as near-duplicates")
+    add = sub.add_parser("import", help="Add existing image files to the archive")
+    add.add_argument("animal")
+    add.add_argument("files", nargs="+")
+    args = parser.parse_args()
+
+    if args.command == "import":
+        archive = ImageArchive()
+        for path in args.files:
+            with open(path, "rb") as f:
+                entry = archive.add(f.read(), args.animal, created_at=import_timestamp(path))
+            print(f"{entry['sha256'][:12]} {entry['created_at']} {path}")
+        archive.commit(f"Import {len(args.files)} {args.animal} image(s) into the archive")
+        return
+
+    manifest = load_manifest(path=args.manifest)
+    for entry in manifest["images"]:
+        if args.command == "duplicates" and not entry["near_duplicate_of"]:
+            continue
+        dupe = f" ~{entry['near_duplicate_of'][:12]}" if entry["near_duplicate_of"] else ""
+        print(f"{entry['sha256'][:12]} {entry['created_at']} {entry['animal']:<8} {entry['width']}x{entry['height']} {entry['bytes']:>8}{dupe}")
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,110 @@
+import io
+from typing import NamedTuple
+from PIL import Image
+
+MAX_BLOB_SIZE = 1000000  # Bluesky uploadBlob limit for images (bytes)
+MIN_QUALITY = 40  # Below this we resize instead of degrading quality further
+MAX_QUALITY = 90
+RESIZE_MARGIN = 0.95  # Aim a little under the limit when computing a resize factor
+SIZE_TOLERANCE = 0.9  # Any fitting encode at least this close to the limit is good enough
+
+class EncodeResult(NamedTuple):
+    data: memoryview  # view over the encoder's BytesIO, no extra copy
+    format: str
+    quality: int
+    size: tuple
+    encodes: int
+
+def _prepare(img, img_format):
+    """Convert the image to a mode the target format can store"""
+    if img_format == "JPEG" and img.mode != "RGB":
+        return img.convert("RGB")
+    if img_format == "WEBP" and img.mode not in ("RGB", "RGBA"):
+        return img.convert("RGBA" if "A" in img.getbands() else "RGB")
+    return img
+
+def _encode(img, img_format, quality) -> memoryview:
+    buffer = io.BytesIO()
+    if img_format == "WEBP":
+        img.save(buffer, format=img_format, quality=quality, method=4)
+    else:
+        # No optimize=True: its extra Huffman pass on every trial encode costs
+        # more wall time than the search saves
+        img.save(buffer, format=img_format, quality=quality)
+    return buffer.getbuffer()
+
+def _search_quality(img, img_format, max_size, lo, hi, lo_size, hi_size):
+    """Find a high quality in (lo, hi) that fits, given lo fits and hi does not.
+
+    Each guess is interpolated from the sizes at the current bounds, and the
+    search stops as soon as an encode lands within SIZE_TOLERANCE of max_size,
+    so it usually takes one or two encodes instead of walking the range.
+    """
+    best_quality, best_data = lo, None
+    encodes = 0
+    while hi - lo > 1:
+        guess = lo + int((hi - lo) * (max_size - lo_size) / max(hi_size - lo_size, 1))
+        q = min(max(guess, lo + 1), hi - 1)
+        data = _encode(img, img_format, q)
+        encodes += 1
+        if len(data) <= max_size:
+            lo, lo_size, best_quality, best_data = q, len(data), q, data
+            if len(data) >= max_size * SIZE_TOLERANCE:
+                break
+        else:
+            hi, hi_size = q, len(data)
+    return best_quality, best_data, encodes
+
+def encode_image(img, max_size=MAX_BLOB_SIZE, img_format="JPEG",
+                 min_quality=MIN_QUALITY, max_quality=MAX_QUALITY) -> EncodeResult:
+    """Encode a PIL image so the result is no larger than max_size bytes.
+
+    One probe encode at max_quality decides whether any search is needed. If
+    the image does not fit even at min_quality, it is resized once by a factor
+    predicted from the probe size rather than shrunk step by step.
+    """
+    img_format = img_format.upper()
+    img = _prepare(img, img_format)
+    encodes = 0
+
+    data = _encode(img, img_format, max_quality)
+    encodes += 1
+    if len(data) <= max_size:
+        return EncodeResult(data, img_format, max_quality, img.size, encodes)
+    hi_size = len(data)
+
+    low = _encode(img, img_format, min_quality)
+    encodes += 1
+    lo_size = len(low)
+    if lo_size > max_size:
+        # Encoded size scales roughly with pixel count, so predict the scale at
+        # which max_quality fits and resize once. Loop only as a safeguard.
+        while True:
+            scale = (max_size * RESIZE_MARGIN / hi_size) ** 0.5
+            width, height = img.size
+            new_size = (max(1, int(width * scale)), max(1, int(height * scale)))
+            if new_size == img.size:
+                raise Exception(f"Unable to encode image under {max_size} bytes")
+            img = img.resize(new_size, Image.Resampling.LANCZOS)
+            data = _encode(img, img_format, max_quality)
+            encodes += 1
+            if len(data) <= max_size:
+                return EncodeResult(data, img_format, max_quality, img.size, encodes)
+            hi_size = len(data)
+            lo_size = int(lo_size * scale * scale)
+            if lo_size <= max_size * RESIZE_MARGIN:
+                low = None
+                break
+
+    quality, best, search_encodes = _search_quality(
+        img, img_format, max_size, min_quality, max_quality, lo_size, hi_size
+    )
+    encodes += search_encodes
+    if best is None:
+        if low is None:
+            low = _encode(img, img_format, min_quality)
+            encodes += 1
+            if len(low) > max_size:
+                raise Exception(f"Unable to encode image under {max_size} bytes")
+        best = low
+    return EncodeResult(best, img_format, quality, img.size, encodes)
@@ -0,0 +1,50 @@
+import os
+from typing import List
+from http_pool import get_session
+
+IMAGES_URL = "https://api.openai.com/v1/images/generations"
+IMAGE_MODEL = "gpt-image-1"
+IMAGE_SIZE = "1024x1024"
+MAX_BATCH = 10  # The images API accepts n between 1 and 10
+
+PROMPT_TEMPLATE = "Create an image of {subject} that is creative and unique with a {theme} theme. {style} {setting} {activity}"
+DEFAULT_STYLE = "Choose a random art style."
+DEFAULT_SETTING = "Choose a random setting."
+
+def build_prompt(subject, theme, style=DEFAULT_STYLE, setting=DEFAULT_SETTING, activity=""):
+    return PROMPT_TEMPLATE.format(
+        subject=subject, theme=theme, style=style, setting=setting, activity=activity
+    ).strip()
+
+def generate_images(subject, theme, n=1, style=DEFAULT_STYLE, setting=DEFAULT_SETTING, activity="", http=None) -> List[str]:
+    """Generate n images for one prompt and return their base64 payloads.
+
+    Requests are batched up to MAX_BATCH images each and share one pooled
+    connection, so a prefill of several images pays the request overhead once.
+    """
+    # https://platform.openai.com/docs/api-reference/images
+    http = http or get_session()
+    prompt = build_prompt(subject, theme, style, setting, activity)
+    api_key = os.getenv("OPENAI_API_KEY")
+    images = []
+    while len(images) < n:
+        batch = min(n - len(images), MAX_BATCH)
+        response = http.post(
+            IMAGES_URL,
+            headers={
+                "Content-Type": "application/json",
+                "Authorization": f"Bearer {api_key}"
+            },
+            json={
+                "model": IMAGE_MODEL,
+                "prompt": prompt,
+                "n": batch,
+                "size": IMAGE_SIZE
+            }
+        )
+        response.raise_for_status()
+        data = response.json()['data']
+        if not data:
+            raise Exception("Image generation returned no images")
+        images.extend(item['b64_json'] for item in data)
+    return images
@@ -0,0 +1,105 @@
+import os
+import json
+import uuid
+from datetime import datetime, timezone
+from typing import NamedTuple, Optional
+
+QUEUE_DIR = os.path.join("generated", "queue")  # Not committed; persisted between runs by the Actions cache
+DEFAULT_DEPTH = 4
+
+class QueuedImage(NamedTuple):
+    """An entry claimed by pop(); call commit() once it is posted, or release() to give it back"""
+    data: memoryview
+    alt_text: str
+    format: str
+    created_at: str
+    meta_path: str
+    image_path: str
+
+    @property
+    def claimed_path(self):
+        return self.meta_path + ".claimed"
+
+    def commit(self):
+        """Delete the entry; only call this after the image has been posted"""
+        os.remove(self.image_path)
+        os.remove(self.claimed_path)
+
+    def release(self):
+        """Put the entry back at its old place in the queue so a later run can post it"""
+        os.replace(self.claimed_path, self.meta_path)
+
+class ImageQueue:
+    """A rolling on-disk queue of ready-to-post images for one bot.
+
+    Each entry is an encoded image plus a JSON sidecar. The sidecar is written
+    last and claimed with an atomic rename, so a reader never sees a half
+    written entry and two runs can never post the same image. A claimed entry
+    is only deleted once its post succeeds.
+    """
+
+    def __init__(self, name, root=QUEUE_DIR):
+        self.path = os.path.join(root, name)
+        os.makedirs(self.path, exist_ok=True)
+
+    def _entries(self):
+        return sorted(f for f in os.listdir(self.path) if f.endswith(".json"))
+
+    def __len__(self):
+        return len(self._entries())
+
+    def push(self, data, alt_text, img_format) -> str:
+        now = datetime.now(timezone.utc)
+        entry_id = f"{now.strftime('%Y%m%d_%H%M%S_%f')}_{uuid.uuid4().hex[:8]}"
+        image_file = f"{entry_id}.{img_format.lower()}"
+        tmp_path = os.path.join(self.path, image_file + ".tmp")
+        with open(tmp_path, "wb") as f:
+            f.write(data)
+        os.replace(tmp_path, os.path.join(self.path, image_file))
+
+        meta = {
+            "image": image_file,
+            "alt_text": alt_text,
+            "format": img_format.upper(),
+            "created_at": now.isoformat().replace("+00:00", "Z"),
+        }
+        meta_path = os.path.join(self.path, f"{entry_id}.json")
+        with open(meta_path + ".tmp", "w") as f:
+            json.dump(meta, f)
+        os.replace(meta_path + ".tmp", meta_path)
+        return meta_path
+
+    def pop(self) -> Optional[QueuedImage]:
+        """Claim the oldest image, or return None if the queue is empty.
+
+        The files stay on disk until the caller commits or releases the entry,
+        so a failed post does not throw away a generated image.
+        """
+        for entry in self._entries():
+            meta_path = os.path.join(self.path, entry)
+            claimed = meta_path + ".claimed"
+            try:
+                os.rename(meta_path, claimed)
+            except FileNotFoundError:
+                continue  # Another run claimed it first
+            with open(claimed) as f:
+                meta = json.load(f)
+            image_path = os.path.join(self.path, meta["image"])
+            with open(image_path, "rb") as f:
+                data = f.read()
+            return QueuedImage(memoryview(data), meta["alt_text"], meta["format"], meta["created_at"], meta_path, image_path)
+        return None
+
+    def fill(self, produce, alt_text, depth=DEFAULT_DEPTH, batch_size=1) -> int:
+        """Top the queue up to depth images; returns how many were added.
+
+        produce(count) must return a list of image_encoder.EncodeResult, so a
+        caller can generate several images per request and split them here.
+        """
+        added = 0
+        while len(self) < depth:
+            results = produce(min(batch_size, depth - len(self)))
+            for result in results:
+                self.push(result.data, alt_text, result.format)
+            added += len(results)
+        return added
@@ -0,0 +1,152 @@
+import os
+import io
+import sys
+import glob
+import gzip
+import time
+import atexit
+import shutil
+import signal
+import threading
+from datetime import datetime
+from collections import deque
+
+MAX_BYTES = 10 * 1000 * 1000  # Rotate the live file at this size
+BACKUP_COUNT = 20  # Gzipped segments kept next to the live file
+QUEUE_SIZE = 100000  # Pending writes; a caller that gets this far ahead of the writer waits for it
+BATCH_SIZE = 1000  # Writes joined into one file write; also wakes the writer early
+FLUSH_INTERVAL = 0.5  # Seconds; queued lines reach the file at least this often
+
+_STOP = object()
+
+class LogSink(io.TextIOBase):
+    """Text stream that hands writes to a background thread, for use as sys.stdout.
+
+    write() only appends to a bounded deque (no lock, no syscall). The writer
+    thread wakes every FLUSH_INTERVAL, or as soon as a batch is queued, writes
+    what is queued in batches,
+    rotates the file past max_bytes (or max_age seconds) and gzips the rotated
+    segment to <path>.<timestamp>.gz, keeping the newest `backups`.
+    """
+
+    def __init__(self, path, max_bytes=MAX_BYTES, max_age=None, backups=BACKUP_COUNT, queue_size=QUEUE_SIZE):
+        super().__init__()
+        self.path = path
+        self.max_bytes = max_bytes
+        self.max_age = max_age
+        self.backups = backups
+        self.queue_size = queue_size
+        self.pending = deque()
+        self.closing = False
+        self.wake = threading.Event()
+        self._open()
+        self.thread = threading.Thread(target=self._run, name="log-sink", daemon=True)
+        self.thread.start()
+
+    @property
+    def encoding(self):
+        return "utf-8"
+
+    def writable(self):
+        return True
+
+    def write(self, text):
+        if self.closing:
+            return 0
+        pending = self.pending
+        pending.append(text)
+        if len(pending) >= BATCH_SIZE:
+            if not self.wake.is_set():
+                self.wake.set()
+            while len(pending) >= self.queue_size and self.thread.is_alive():
+                time.sleep(0.001)  # Back-pressure instead of losing lines
+        return len(text)
+
+    def flush(self):
+        """Block until everything written so far is on disk"""
+        if self.closing or not self.thread.is_alive():
+            return
+        done = threading.Event()
+        self.pending.append(done)
+        self.wake.set()
+        done.wait()
+
+    def close(self):
+        if self.closing:
+            return
+        self.closing = True
+        self.pending.append(_STOP)
+        self.wake.set()
+        self.thread.join()
+        super().close()
+
+    def _open(self):
+        self.file = open(self.path, "a", encoding="utf-8")
+        self.opened = time.monotonic()
+
+    def _run(self):
+        while True:
+            self.wake.wait(FLUSH_INTERVAL)
+            self.wake.clear()
+            if self._drain():
+                self.file.close()
+                return
+
+    def _drain(self):
+        """Write out everything queued; returns True once the stop marker is reached"""
+        batch = []
+        while True:
+            try:
+                item = self.pending.popleft()
+            except IndexError:
+                item = None
+            if isinstance(item, str):
+                batch.append(item)
+                if len(batch) < BATCH_SIZE:
+                    continue
+            self._write(batch)
+            batch = []
+            if item is None:
+                self.file.flush()
+                return False
+            if item is _STOP:
+                self.file.flush()
+                return True
+            if isinstance(item, threading.Event):
+                self.file.flush()
+                item.set()
+
+    def _write(self, batch):
+        if not batch:
+            return
+        self.file.write("".join(batch))
+        if self.file.tell() >= self.max_bytes or (self.max_age and time.monotonic() - self.opened >= self.max_age):
+            self._rotate()
+
+    def _rotate(self):
+        self.file.close()
+        target = f"{self.path}.{datetime.now().strftime('%Y%m%d_%H%M%S_%f')}.gz"
+        with open(self.path, "rb") as src, gzip.open(target, "wb") as dst:
+            shutil.copyfileobj(src, dst)
+        os.remove(self.path)
+        for old in sorted(glob.glob(glob.escape(self.path) + ".*.gz"))[:-self.backups or None]:
+            os.remove(old)
+        self._open()
+
+def install(path, max_bytes=MAX_BYTES, max_age=None, backups=BACKUP_COUNT):
+    """Redirect sys.stdout to a LogSink; it is flushed and closed at exit and on SIGTERM"""
+    sink = LogSink(path, max_bytes=max_bytes, max_age=max_age, backups=backups)
+    original = sys.stdout
+    sys.stdout = sink
+
+    def shutdown():
+        sys.stdout = original
+        sink.close()
+
+    def on_sigterm(signum, frame):
+        shutdown()
+        sys.exit(128 + signum)
+
+    atexit.register(shutdown)
+    signal.signal(signal.SIGTERM, on_sigterm)
+    return sink
@@ -0,0 +1,157 @@
+import os
+import json
+import time
+import atexit
+import threading
+from datetime import datetime, timezone
+
+METRICS_DIR_ENV = "BOT_METRICS_DIR"  # Enables metrics for any entry point without a CLI flag
+PREFIX = "closetbots_"
+# Histogram buckets in seconds; stages range from sub-millisecond screening to minute-long generations
+BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120)
+
+_enabled = False
+_job = None
+_out_dir = None
+_started = None
+_lock = threading.Lock()
+_counters = {}
+_histograms = {}
+
+class _NullTimer:
+    """Returned by timer() when metrics are off: one shared object, no clock reads"""
+    def __enter__(self):
+        return self
+    def __exit__(self, *exc):
+        return False
+
+_NULL_TIMER = _NullTimer()
+
+class _Timer:
+    __slots__ = ("key", "start")
+
+    def __init__(self, key):
+        self.key = key
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        _observe(self.key, time.perf_counter() - self.start)
+        return False
+
+def _key(name, labels):
+    return (name, tuple(sorted(labels.items())))
+
+def _observe(key, value):
+    with _lock:
+        _histograms.setdefault(key, []).append(value)
+
+def configure(job, out_dir=None):
+    """Turn metrics on for this run if out_dir (or $BOT_METRICS_DIR) is set; files are written at exit"""
+    global _enabled, _job, _out_dir, _started
+    out_dir = out_dir or os.getenv(METRICS_DIR_ENV)
+    if not out_dir:
+        return False
+    _enabled, _job, _out_dir = True, job, out_dir
+    _started = datetime.now(timezone.utc)
+    atexit.register(write)
+    return True
+
+def enabled():
+    return _enabled
+
+def counter(name, value=1, **labels):
+    if not _enabled:
+        return
+    key = _key(name, labels)
+    with _lock:
+        _counters[key] = _counters.get(key, 0) + value
+
+def observe(name, value, **labels):
+    """Record one observation in a histogram"""
+    if _enabled:
+        _observe(_key(name, labels), value)
+
+def timer(name="stage_seconds", **labels):
+    """Context manager timing a block into a histogram, e.g. with timer(stage="login"):"""
+    if not _enabled:
+        return _NULL_TIMER
+    return _Timer(_key(name, labels))
+
+def _percentile(values, q):
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, max(0, round(q * (len(ordered) - 1))))
+    return ordered[index]
+
+def _labels_text(labels, extra=()):
+    pairs = list(labels) + list(extra)
+    if not pairs:
+        return ""
+    return "{" + ",".join(f'{k}="{str(v)}"' for k, v in pairs) + "}"
+
+def snapshot():
+    """Return the current metrics as a JSON-serialisable dict"""
+    with _lock:
+        counters = dict(_counters)
+        histograms = {key: list(values) for key, values in _histograms.items()}
+    return {
+        "job": _job,
+        "started_at": _started.isoformat().replace("+00:00", "Z") if _started else None,
+        "counters": [
+            {"name": name, "labels": dict(labels), "value": value}
+            for (name, labels), value in sorted(counters.items())
+        ],
+        "histograms": [
+            {
+                "name": name, "labels": dict(labels), "count": len(values), "sum": sum(values),
+                "min": min(values), "max": max(values),
+                "p50": _percentile(values, 0.5), "p90": _percentile(values, 0.9), "p99": _percentile(values, 0.99),
+            }
+            for (name, labels), values in sorted(histograms.items())
+        ],
+    }
+
+def prometheus_text():
+    """Render the metrics in the Prometheus text exposition format (for the node_exporter textfile collector)"""
+    with _lock:
+        counters = dict(_counters)
+        histograms = {key: list(values) for key, values in _histograms.items()}
+    job = (("job", _job),) if _job else ()
+    lines = []
+    for name in sorted({name for name, _ in counters}):
+        lines.append(f"# TYPE {PREFIX}{name}_total counter")
+        for (n, labels), value in sorted(counters.items()):
+            if n == name:
+                lines.append(f"{PREFIX}{name}_total{_labels_text(job + labels)} {value}")
+    for name in sorted({name for name, _ in histograms}):
+        lines.append(f"# TYPE {PREFIX}{name} histogram")
+        for (n, labels), values in sorted(histograms.items()):
+            if n != name:
+                continue
+            for bound in BUCKETS:
+                count = sum(1 for v in values if v <= bound)
+                lines.append(f"{PREFIX}{name}_bucket{_labels_text(job + labels, [('le', bound)])} {count}")
+            lines.append(f"{PREFIX}{name}_bucket{_labels_text(job + labels, [('le', '+Inf')])} {len(values)}")
+            lines.append(f"{PREFIX}{name}_sum{_labels_text(job + labels)} {sum(values)}")
+            lines.append(f"{PREFIX}{name}_count{_labels_text(job + labels)} {len(values)}")
+    if _started:
+        lines.append(f"# TYPE {PREFIX}last_run_timestamp_seconds gauge")
+        lines.append(f"{PREFIX}last_run_timestamp_seconds{_labels_text(job)} {_started.timestamp():.0f}")
+    return "\n".join(lines) + "\n"
+
+def write():
+    """Write <job>_<timestamp>.json and <job>.prom into the metrics directory"""
+    if not _enabled:
+        return None
+    os.makedirs(_out_dir, exist_ok=True)
+    stamp = _started.strftime("%Y%m%d_%H%M%S")
+    json_path = os.path.join(_out_dir, f"{_job}_{stamp}.json")
+    with open(json_path, "w") as f:
+        json.dump(snapshot(), f, indent=2)
+    prom_path = os.path.join(_out_dir, f"{_job}.prom")
+    with open(prom_path + ".tmp", "w") as f:
+        f.write(prometheus_text())
+    os.replace(prom_path + ".tmp", prom_path)
+    return json_path
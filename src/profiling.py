@@ -0,0 +1,125 @@
+import io
+import os
+import sys
+import time
+import pstats
+import cProfile
+import threading
+import tracemalloc
+from collections import Counter
+from datetime import datetime, timezone
+
+PROFILE_DIR = "profile"  # Default directory for --profile with no argument
+SAMPLE_INTERVAL = 0.005  # Seconds between stack samples for the collapsed-stack file
+TOP_FUNCTIONS = 40  # Rows per table in the hotspot report
+TOP_ALLOCATIONS = 25  # Rows per table in the memory report
+TRACEMALLOC_FRAMES = 1  # Only the allocating line is reported; deeper tracebacks multiply tracing overhead
+PEAK_SNAPSHOT_GROWTH = 1.25  # Re-snapshot when traced memory grows this much past the last snapshot
+
+def _frame_name(code):
+    return f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})"
+
+class _Sampler(threading.Thread):
+    """Samples every thread's stack on a timer and keeps a tracemalloc snapshot near the memory peak.
+
+    cProfile only sees the thread that started it; the sampler also covers the
+    upload, archive and refill worker threads.
+    """
+
+    def __init__(self):
+        super().__init__(name="profiler-sampler", daemon=True)
+        self.stacks = Counter()
+        self.samples = 0
+        self.snapshot = None
+        self.snapshot_size = 0
+        self.stopped = threading.Event()
+
+    def run(self):
+        own = threading.get_ident()
+        while not self.stopped.wait(SAMPLE_INTERVAL):
+            names = {t.ident: t.name for t in threading.enumerate()}
+            for ident, frame in sys._current_frames().items():
+                if ident == own:
+                    continue
+                stack = []
+                while frame is not None:
+                    stack.append(_frame_name(frame.f_code))
+                    frame = frame.f_back
+                stack.append(names.get(ident, f"thread-{ident}"))
+                self.stacks[";".join(reversed(stack))] += 1
+            self.samples += 1
+
+            current, _ = tracemalloc.get_traced_memory()
+            if current > self.snapshot_size * PEAK_SNAPSHOT_GROWTH:
+                self.snapshot = tracemalloc.take_snapshot()
+                self.snapshot_size = current
+
+    def stop(self):
+        self.stopped.set()
+        self.join()
+
+def _hotspot_report(profiler, elapsed):
+    out = io.StringIO()
+    out.write(f"Wall time: {elapsed:.3f}s (main thread only; see the .collapsed file for worker threads)\n")
+    out.write("tracemalloc was running: allocation-heavy Python code is slower than in a normal run\n\n")
+    for title, key in (("By own time", "tottime"), ("By cumulative time", "cumulative")):
+        out.write(f"=== {title} ===\n")
+        stats = pstats.Stats(profiler, stream=out)
+        stats.strip_dirs().sort_stats(key).print_stats(TOP_FUNCTIONS)
+    return out.getvalue()
+
+def _memory_report(snapshot, snapshot_size, current, peak):
+    out = io.StringIO()
+    out.write(f"Peak traced memory: {peak / 1e6:.2f} MB\n")
+    out.write(f"Traced memory at exit: {current / 1e6:.2f} MB\n")
+    out.write(f"Snapshot taken at: {snapshot_size / 1e6:.2f} MB\n\n")
+    snapshot = snapshot.filter_traces((
+        tracemalloc.Filter(False, tracemalloc.__file__),
+        tracemalloc.Filter(False, __file__),
+    ))
+    out.write("=== Top allocations by line ===\n")
+    for stat in snapshot.statistics("lineno")[:TOP_ALLOCATIONS]:
+        out.write(f"{stat.size / 1e3:10.1f} KB {stat.count:8d} blocks  {stat.traceback[0]}\n")
+    out.write("\n=== Top allocations by file ===\n")
+    for stat in snapshot.statistics("filename")[:TOP_ALLOCATIONS]:
+        out.write(f"{stat.size / 1e3:10.1f} KB {stat.count:8d} blocks  {stat.traceback[0].filename}\n")
+    return out.getvalue()
+
+def run(job, out_dir, func, *args, **kwargs):
+    """Call func(*args, **kwargs); if out_dir is set, profile it and write reports there.
+
+    Writes <job>_<timestamp>.pstats (raw cProfile data), .hotspots.txt (sorted
+    by own and cumulative time), .memory.txt (tracemalloc peak and the top
+    allocation sites near it) and .collapsed (folded stacks for flamegraph.pl
+    or speedscope). Reports are written even if func raises.
+    """
+    if not out_dir:
+        return func(*args, **kwargs)
+
+    os.makedirs(out_dir, exist_ok=True)
+    prefix = os.path.join(out_dir, f"{job}_{datetime.now(timezone.utc).strftime('%Y%m%d_%H%M%S')}")
+    tracemalloc.start(TRACEMALLOC_FRAMES)
+    sampler = _Sampler()
+    sampler.start()
+    profiler = cProfile.Profile()
+    start = time.perf_counter()
+    try:
+        return profiler.runcall(func, *args, **kwargs)
+    finally:
+        elapsed = time.perf_counter() - start
+        sampler.stop()
+        current, peak = tracemalloc.get_traced_memory()
+        snapshot, snapshot_size = sampler.snapshot, sampler.snapshot_size
+        if snapshot is None:
+            snapshot, snapshot_size = tracemalloc.take_snapshot(), current
+        tracemalloc.stop()
+
+        profiler.dump_stats(prefix + ".pstats")
+        with open(prefix + ".hotspots.txt", "w") as f:
+            f.write(_hotspot_report(profiler, elapsed))
+        with open(prefix + ".memory.txt", "w") as f:
+            f.write(_memory_report(snapshot, snapshot_size, current, peak))
+        with open(prefix + ".collapsed", "w") as f:
+            for stack, count in sorted(sampler.stacks.items()):
+                f.write(f"{stack} {count}\n")
+        print(f"Profile written to {prefix}.* ({elapsed:.1f}s, {sampler.samples} samples, peak {peak / 1e6:.1f} MB)")
@@ -0,0 +1,181 @@
+import time
+import random
+import threading
+from email.utils import parsedate_to_datetime
+from urllib.parse import urlsplit
+import requests
+import metrics
+
+DEFAULT_RATE = 10.0  # Requests per second per host until the server tells us otherwise
+DEFAULT_BURST = 10
+DEFAULT_DEADLINE = 120.0  # Seconds a single call may spend waiting and retrying
+BACKOFF_BASE = 0.5  # First retry delay in seconds, doubled per attempt
+BACKOFF_MAX = 30.0
+IDEMPOTENT_METHODS = ("GET", "HEAD", "OPTIONS", "PUT", "DELETE")
+
+class RateLimitTimeout(requests.exceptions.Timeout):
+    """Waiting for the rate limit would pass the deadline; a Timeout so existing requests handlers catch it"""
+
+class TokenBucket:
+    """Thread-safe token bucket whose rate can be retuned from response headers"""
+
+    def __init__(self, rate=DEFAULT_RATE, capacity=DEFAULT_BURST):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = float(capacity)
+        self.updated = time.monotonic()
+        self.paused_until = 0.0
+        self.lock = threading.Lock()
+
+    def _refill(self, now):
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def acquire(self, deadline):
+        """Block until a token is available; raise RateLimitTimeout if that would pass deadline (monotonic)"""
+        while True:
+            with self.lock:
+                now = time.monotonic()
+                self._refill(now)
+                if now >= self.paused_until and self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                wait = max(self.paused_until - now, (1 - self.tokens) / self.rate)
+            if now + wait > deadline:
+                raise RateLimitTimeout(f"rate limit wait of {wait:.1f}s exceeds the deadline")
+            time.sleep(wait)
+
+    def pause(self, seconds):
+        with self.lock:
+            self.paused_until = max(self.paused_until, time.monotonic() + seconds)
+
+    def update(self, limit=None, window=None, remaining=None, reset_in=None):
+        """Apply a server's advertised limit: pace at limit/window and never exceed remaining"""
+        with self.lock:
+            self._refill(time.monotonic())
+            if limit and window:
+                self.rate = limit / window
+                self.capacity = max(1, min(limit, DEFAULT_BURST))
+            if remaining is not None:
+                self.tokens = min(self.tokens, remaining)
+                if remaining <= 0 and reset_in:
+                    self.paused_until = max(self.paused_until, time.monotonic() + reset_in)
+
+def _number(value):
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return None
+
+def parse_rate_limit(headers):
+    """Read IETF/Bluesky style ratelimit-* headers into TokenBucket.update() arguments"""
+    limit = _number(headers.get("ratelimit-limit"))
+    remaining = _number(headers.get("ratelimit-remaining"))
+    window = None
+    policy = headers.get("ratelimit-policy")
+    if policy:
+        for part in policy.split(";")[1:]:
+            key, _, value = part.strip().partition("=")
+            if key == "w":
+                window = _number(value)
+    reset_in = _number(headers.get("ratelimit-reset"))
+    if reset_in is not None and reset_in > 1e9:
+        reset_in = reset_in - time.time()  # Bluesky sends an epoch timestamp, the draft spec sends seconds
+    return dict(limit=limit, window=window, remaining=remaining, reset_in=reset_in)
+
+def route_key(url):
+    """host plus XRPC method (or path): Bluesky advertises its limits per route, not per host"""
+    parts = urlsplit(url)
+    return parts.netloc, parts.path
+
+def should_retry(method, response):
+    """429 means the request was refused, so it is always safe to send again.
+
+    A 503 may come from a gateway after the upstream already committed the
+    write, so it is only retried for idempotent methods, or when the server
+    asks for a retry with Retry-After.
+    """
+    if response.status_code == 429:
+        return True
+    if response.status_code == 503:
+        return method.upper() in IDEMPOTENT_METHODS or "retry-after" in response.headers
+    return False
+
+def retry_after(headers):
+    """Seconds to wait from a Retry-After header (delta seconds or HTTP date), or None"""
+    value = headers.get("retry-after")
+    if value is None:
+        return None
+    seconds = _number(value)
+    if seconds is not None:
+        return seconds
+    try:
+        return parsedate_to_datetime(value).timestamp() - time.time()
+    except (TypeError, ValueError):
+        return None
+
+class RequestScheduler:
+    """Per-host and per-route token buckets plus jittered exponential backoff for throttled calls.
+
+    send() paces every request through its host's bucket at the default rate
+    and through a bucket for its route (host plus XRPC method). Only the route
+    bucket is retuned from ratelimit-* headers and paused by Retry-After, so a
+    throttled createSession can't stall uploads or posts on the same host.
+    Throttled responses are retried (see should_retry) until the call's
+    deadline.
+    """
+
+    def __init__(self, default_rate=DEFAULT_RATE, default_burst=DEFAULT_BURST, deadline=DEFAULT_DEADLINE):
+        self.default_rate = default_rate
+        self.default_burst = default_burst
+        self.deadline = deadline
+        self.buckets = {}
+        self.lock = threading.Lock()
+
+    def _bucket(self, key) -> TokenBucket:
+        with self.lock:
+            if key not in self.buckets:
+                self.buckets[key] = TokenBucket(self.default_rate, self.default_burst)
+            return self.buckets[key]
+
+    def bucket(self, url) -> TokenBucket:
+        """Default pace for everything sent to the url's host"""
+        return self._bucket(urlsplit(url).netloc)
+
+    def route_bucket(self, url) -> TokenBucket:
+        """Pace for one route, retuned from that route's ratelimit-* headers"""
+        return self._bucket(route_key(url))
+
+    def send(self, url, do_request, rewind=None, deadline=None, method="GET"):
+        """Call do_request() under the host and route rate limits, retrying throttled responses.
+
+        rewind is called before each retry so a streamed body can be re-sent.
+        The last response is returned once retries are exhausted, so callers
+        keep using raise_for_status() as before. If waiting for a token would
+        pass the deadline (e.g. a route paused by ratelimit-remaining: 0 with a
+        long reset), RateLimitTimeout is raised instead; it is a
+        requests.exceptions.Timeout, so RequestException handlers catch it.
+        """
+        host_bucket = self.bucket(url)
+        bucket = self.route_bucket(url)
+        end = time.monotonic() + (deadline if deadline is not None else self.deadline)
+        attempt = 0
+        while True:
+            bucket.acquire(end)
+            host_bucket.acquire(end)
+            response = do_request()
+            bucket.update(**parse_rate_limit(response.headers))
+            if not should_retry(method, response):
+                return response
+
+            delay = retry_after(response.headers)
+            if delay is None:
+                delay = min(BACKOFF_MAX, BACKOFF_BASE * 2 ** attempt) * (0.5 + random.random())
+            if time.monotonic() + delay > end:
+                return response
+            bucket.pause(delay)
+            metrics.counter("rate_limit_retries", host=urlsplit(url).netloc, status=response.status_code)
+            attempt += 1
+            if rewind:
+                rewind()
+            response.close()
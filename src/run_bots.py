@@ -0,0 +1,72 @@
+import sys
+import time
+import argparse
+import traceback
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+import check_nuclear_events
+import onlykittens_bot
+import onlypuppies_bot
+import top4news_bot
+import metrics
+import profiling
+
+def run_nuclear(args):
+    check_nuclear_events.DEBUG_LEVEL = args.debug_level
+    check_nuclear_events.main()
+
+# Every job runs in this process, so they share the pooled HTTP session
+# (http_pool) and the per-account Bluesky session cache (bsky_auth).
+JOBS = {
+    "top4news": lambda args: top4news_bot.main(),
+    "onlykittens": lambda args: onlykittens_bot.main(refill=args.refill),
+    "onlypuppies": lambda args: onlypuppies_bot.main(refill=args.refill),
+    "nuclear": run_nuclear,
+}
+
+def run_job(name, args):
+    start = time.perf_counter()
+    try:
+        JOBS[name](args)
+        ok = True
+    except Exception:
+        print(f"[{name}] failed:\n{traceback.format_exc()}")
+        ok = False
+    elapsed = time.perf_counter() - start
+    metrics.observe("job_seconds", elapsed, job_name=name)
+    if not ok:
+        metrics.counter("job_failures", job_name=name)
+    return name, ok, elapsed
+
+def run(names, args):
+    """Run the selected jobs concurrently; returns True if all of them succeeded"""
+    start = time.perf_counter()
+    results = []
+    with ThreadPoolExecutor(max_workers=len(names)) as pool:
+        futures = [pool.submit(run_job, name, args) for name in names]
+        for future in as_completed(futures):
+            name, ok, elapsed = future.result()
+            print(f"[{name}] {'ok' if ok else 'FAILED'} in {elapsed:.1f}s")
+            results.append(ok)
+    print(f"Ran {len(names)} job(s) in {time.perf_counter() - start:.1f}s")
+    return all(results)
+
+def main():
+    parser = argparse.ArgumentParser(description="Run any subset of the bots in one process.")
+    parser.add_argument("jobs", nargs="*", metavar="JOB",
+                        help=f"Jobs to run ({', '.join(sorted(JOBS))}); default: all")
+    parser.add_argument("--refill", type=int, metavar="N", help="Animal bots: top the image queue back up to N after posting", default=0)
+    parser.add_argument("--debug-level", type=int, help="Nuclear monitor debug level (0-5)", default=check_nuclear_events.DEBUG_INFO)
+    parser.add_argument("--metrics-dir", help="Write per-run metrics (JSON and Prometheus text) to this directory", default=None)
+    parser.add_argument("--profile", nargs="?", const=profiling.PROFILE_DIR, metavar="DIR", help="Profile the run (cProfile, tracemalloc, collapsed stacks) and write reports to DIR (default: profile)", default=None)
+    args = parser.parse_args()
+    unknown = [name for name in args.jobs if name not in JOBS]
+    if unknown:
+        parser.error(f"unknown job(s): {', '.join(unknown)}")
+
+    names = list(dict.fromkeys(args.jobs)) or sorted(JOBS)
+    metrics.configure("run_bots", args.metrics_dir)
+    return 0 if profiling.run("run_bots", args.profile, run, names, args) else 1
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,19 +1,21 @@
 import os
+import argparse
 import requests
-import subprocess
 import string
 import re
 from datetime import datetime, timezone
 from typing import List, Dict
+from http_pool import get_session
+from bsky_auth import login
+import metrics
+import profiling
 
-# Function to log in to Bluesky
+NEWS_URL = "https://ground.news/interest/international"
+REQUEST_TIMEOUT = 15  # Timeout for the news request in seconds
+
+# Function to log in to Bluesky (cached per account)
 def bsky_login_session(pds_url: str, handle: str, password: str):
-    resp = requests.post(
-        pds_url + "/xrpc/com.atproto.server.createSession",
-        json={"identifier": handle, "password": password},
-    )
-    resp.raise_for_status()
-    return resp.json()
+    return login(pds_url, handle, password)
 
 # Function to create a Bluesky post
 def create_bsky_post(session, pds_url, post_content, embed=None):
@@ -35,7 +37,7 @@ def create_bsky_post(session, pds_url, post_content, embed=None):
         post["embed"] = embed
     
     try:
-        resp = requests.post(
+        resp = get_session().post(
             pds_url + "/xrpc/com.atproto.repo.createRecord",
             headers={"Authorization": f"Bearer {session['accessJwt']}"},
             json={
@@ -56,17 +58,15 @@ def create_bsky_post(session, pds_url, post_content, embed=None):
 
 # Function to fetch top 3 news headlines (due to character limit)
 def fetch_top4_news():
-    # Run the curl pipeline command
-    curl_command = """
-    curl -s "https://ground.news/interest/international" | \
-    grep -o '"start":"[^"]*","title":"[^"]*"' | \
-    sed -E 's/"start":"([^"]*)","title":"([^"]*)"/\\1 - \\2/' | \
-    awk -F ' - ' '{print $2}' | head -n 3
-    """
-    result = subprocess.run(curl_command, shell=True, capture_output=True, text=True)
-    if result.returncode != 0:
-        raise RuntimeError(f"Error fetching news: {result.stderr}")
-    return result.stdout.strip().split("\n")
+    # Same extraction as the old curl | grep | sed | awk pipeline, but over the
+    # shared pooled session instead of a shell per run
+    try:
+        resp = get_session().get(NEWS_URL, timeout=REQUEST_TIMEOUT)
+        resp.raise_for_status()
+    except requests.exceptions.RequestException as e:
+        raise RuntimeError(f"Error fetching news: {e}")
+    titles = re.findall(r'"start":"[^"]*","title":"([^"]*)"', resp.text)
+    return [title.split(" - ")[0] for title in titles[:3]]
 
 # Function to reduce content to a < 300-character limit
 def reduce_to_300_chars(headlines, additional_text):
@@ -163,12 +163,14 @@ def main():
     password = os.getenv("BLUESKY_TOP4NEWS_P")
     
     # Log in to Bluesky
-    session = bsky_login_session(pds_url, handle, password)
+    with metrics.timer(stage="login", bot="top4news"):
+        session = bsky_login_session(pds_url, handle, password)
     #print("Session data:", session)  # Debug session details
     
     # Fetch top 3 news headlines
     try:
-        top3_news = fetch_top4_news()
+        with metrics.timer(stage="news_fetch", bot="top4news"):
+            top3_news = fetch_top4_news()
     except RuntimeError as e:
         print("Error fetching news:", e)
         return
@@ -191,8 +193,10 @@ def main():
     
     # Post to Bluesky
     try:
-        create_bsky_post(session, pds_url, post_content, embed)
-    except requests.exceptions.HTTPError as e:
+        with metrics.timer(stage="post", bot="top4news"):
+            create_bsky_post(session, pds_url, post_content, embed)
+        metrics.counter("posts", bot="top4news")
+    except requests.exceptions.RequestException as e:  # Includes rate_limit.RateLimitTimeout
         print("Failed to create post:", e)
         return
 
@@ -200,4 +204,9 @@ def main():
     print("Debug Response:\n", post_content)
 
 if __name__ == "__main__":
-    main()
+    parser = argparse.ArgumentParser(description="Post the top international headlines to Bluesky.")
+    parser.add_argument("--metrics-dir", help="Write per-run metrics (JSON and Prometheus text) to this directory", default=None)
+    parser.add_argument("--profile", nargs="?", const=profiling.PROFILE_DIR, metavar="DIR", help="Profile the run (cProfile, tracemalloc, collapsed stacks) and write reports to DIR (default: profile)", default=None)
+    args = parser.parse_args()
+    metrics.configure("top4news", args.metrics_dir)
+    profiling.run("top4news", args.profile, main)